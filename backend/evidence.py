@@ -0,0 +1,53 @@
+"""
+Evidence helpers - Validate stored snapshot URLs and cache proxied snapshot images
+"""
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+def evidence_object_path(image_url: str, prefix: str) -> Optional[str]:
+    """
+    Object path in the evidence bucket for a stored image_url
+
+    Args:
+        image_url: URL saved on a violation (client-supplied, so untrusted)
+        prefix: Public URL prefix of the evidence bucket
+
+    Returns:
+        The path under the bucket, or None if the URL points anywhere else
+    """
+    if not image_url.startswith(prefix):
+        return None
+    path = image_url[len(prefix):].split('?', 1)[0]
+    if not path or '..' in path.split('/'):
+        return None
+    return path
+
+
+class SnapshotCache:
+    """LRU cache of snapshot images (violation_id -> (bytes, content type)) bounded by total size"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()
+        self.size = 0
+
+    def get(self, violation_id: str) -> Optional[Tuple[bytes, str]]:
+        """Return a cached snapshot and mark it as most recently used"""
+        entry = self.entries.get(violation_id)
+        if entry is not None:
+            self.entries.move_to_end(violation_id)
+        return entry
+
+    def put(self, violation_id: str, content: bytes, content_type: str):
+        """Cache a snapshot, evicting least recently used entries past the size cap"""
+        if len(content) > self.max_bytes:
+            return
+        previous = self.entries.pop(violation_id, None)
+        if previous is not None:
+            self.size -= len(previous[0])
+        self.entries[violation_id] = (content, content_type)
+        self.size += len(content)
+        while self.size > self.max_bytes:
+            _, (evicted, _) = self.entries.popitem(last=False)
+            self.size -= len(evicted)
@@ -155,6 +155,15 @@ class BrowserViolationRequest(BaseModel):
     violation_type: str  # copy_paste, tab_switch
     message: str
 
+class SnapshotUploadUrlRequest(BaseModel):
+    exam_id: str
+    student_id: str
+    violation_type: str
+
+# Admin Models
+class AdminLoginRequest(BaseModel):
+    password: str
+
 # Statistics Models
 class ViolationTimePoint(BaseModel):
     timestamp: datetime
@@ -2,14 +2,17 @@ import cv2
 import mediapipe as mp
 import numpy as np
 from ultralytics import YOLO
-import base64
 from typing import Dict, Optional, Tuple
 import time
+import threading
 from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
+# YOLO class names treated as a mobile phone (checked once per detected box)
+PHONE_CLASSES = frozenset({"cell phone", "phone", "mobile"})
+
 class ProctoringService:
     """
     AI-powered proctoring service using MediaPipe and YOLOv8n
@@ -32,9 +35,9 @@ class ProctoringService:
             self.yolo_model = YOLO('models/yolov8n.pt')
             self.yolo_model.conf = 0.3  # Lowered confidence threshold for better detection
             self.yolo_model.iou = 0.5   # IoU threshold for NMS
-            print("✅ YOLO model loaded successfully")
+            logger.info("✅ YOLO model loaded successfully")
         except Exception as e:
-            print(f"❌ YOLO model loading failed: {e}")
+            logger.error(f"❌ YOLO model loading failed: {e}")
             self.yolo_model = None
         
         # 3D Model points for head pose estimation
@@ -63,6 +66,42 @@ class ProctoringService:
         self.head_pose_tracking: Dict[str, Dict] = {}
         self.HEAD_AWAY_DURATION_THRESHOLD_SEC = 10.0  # 10 seconds of continuously looking away
         
+        # Per-thread colour conversion buffers, reused across frames of the same size
+        self._frame_buffers = threading.local()
+        
+    def _convert_color(self, frame: np.ndarray, code: int, name: str) -> np.ndarray:
+        """
+        Colour-convert a frame into a pre-allocated per-thread buffer instead of
+        allocating a new array on every frame. The returned array is overwritten
+        by the next conversion with the same name on this thread.
+        """
+        channels = 1 if code == cv2.COLOR_BGR2GRAY else 3
+        shape = frame.shape[:2] if channels == 1 else frame.shape[:2] + (channels,)
+        buffer = getattr(self._frame_buffers, name, None)
+        if buffer is None or buffer.shape != shape:
+            buffer = np.empty(shape, dtype=np.uint8)
+            setattr(self._frame_buffers, name, buffer)
+        cv2.cvtColor(frame, code, dst=buffer)
+        return buffer
+
+    def _to_rgb(self, frame: np.ndarray) -> np.ndarray:
+        return self._convert_color(frame, cv2.COLOR_BGR2RGB, 'rgb')
+
+    def _to_gray(self, frame: np.ndarray) -> np.ndarray:
+        return self._convert_color(frame, cv2.COLOR_BGR2GRAY, 'gray')
+        
+    def warmup(self):
+        """
+        Run every model once on a blank frame so lazy initialisation and
+        first-inference costs are paid at startup rather than by a student
+        """
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        rgb_frame = self._to_rgb(frame)
+        self.mp_face_detection.process(rgb_frame)
+        self.mp_face_mesh.process(rgb_frame)
+        if self.yolo_model is not None:
+            self.yolo_model(frame, verbose=False, conf=self.OBJECT_CONFIDENCE_THRESHOLD)
+        
     def estimate_head_pose(self, landmarks, width: int, height: int) -> Optional[Tuple[float, float, float]]:
         """
         Estimate head pose (pitch, yaw, roll) from facial landmarks
@@ -98,7 +137,7 @@ class ProctoringService:
             angles, _, _, _, _, _ = cv2.RQDecomp3x3(rmat)
             return angles  # pitch, yaw, roll
         except Exception as e:
-            print(f"Head pose estimation error: {e}")
+            logger.error(f"Head pose estimation error: {e}")
             return None
 
     def is_looking_away(self, pitch: float, yaw: float, calibrated_pitch: float, calibrated_yaw: float) -> Tuple[bool, float, Optional[str]]:
@@ -139,7 +178,8 @@ class ProctoringService:
         Track head pose over time. Returns a single violation if the user looks away continuously for a set duration.
         """
         if is_looking_away and direction:
-            if session_id not in self.head_pose_tracking:
+            tracking_data = self.head_pose_tracking.get(session_id)
+            if tracking_data is None:
                 # Start tracking when user starts looking away
                 self.head_pose_tracking[session_id] = {
                     'start_time': current_time,
@@ -147,8 +187,6 @@ class ProctoringService:
                     'violation_reported': False  # Flag to ensure violation is reported only once
                 }
                 return None
-
-            tracking_data = self.head_pose_tracking[session_id]
             
             # If direction changes, reset start time and reported flag
             if tracking_data['direction'] != direction:
@@ -170,8 +208,7 @@ class ProctoringService:
                 }
         else:
             # User is not looking away, so reset tracking
-            if session_id in self.head_pose_tracking:
-                del self.head_pose_tracking[session_id]
+            self.head_pose_tracking.pop(session_id, None)
         
         return None
 
@@ -194,7 +231,7 @@ class ProctoringService:
         
         # Check if YOLO model is available
         if self.yolo_model is None:
-            print("⚠️ YOLO model not available, skipping object detection")
+            logger.warning("⚠️ YOLO model not available, skipping object detection")
             detections['annotated_frame'] = frame
             return detections
         
@@ -211,18 +248,20 @@ class ProctoringService:
                 if result.boxes is None or len(result.boxes) == 0:
                     continue
                     
-                for box in result.boxes:
-                    cls = result.names[int(box.cls[0])]
-                    confidence = float(box.conf[0])
+                # Pull classes, scores and boxes off the tensors in one transfer each
+                # instead of indexing a tensor per box
+                boxes = result.boxes
+                for cls_id, confidence, xyxy in zip(boxes.cls.tolist(), boxes.conf.tolist(), boxes.xyxy.tolist()):
+                    cls = result.names[int(cls_id)]
                     
                     # Only process if confidence meets threshold
                     if confidence < self.OBJECT_CONFIDENCE_THRESHOLD:
                         continue
                     
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
+                    x1, y1, x2, y2 = map(int, xyxy)
                     
                     # Detect cell phone (including variations)
-                    if cls in ["cell phone", "phone", "mobile"]:
+                    if cls in PHONE_CLASSES:
                         detections['objects'].append({
                             'type': 'cell phone',
                             'confidence': confidence,
@@ -249,7 +288,7 @@ class ProctoringService:
                         cv2.putText(frame, f"BOOK {confidence:.2f}", (x1, y1 - 10),
                                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 0), 2)
         except Exception as e:
-            print(f"Object detection error: {e}")
+            logger.error(f"Object detection error: {e}")
         
         detections['annotated_frame'] = frame
         return detections
@@ -261,7 +300,7 @@ class ProctoringService:
         """
         try:
             height, width, _ = frame.shape
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            rgb_frame = self._to_rgb(frame)
             
             face_mesh_results = self.mp_face_mesh.process(rgb_frame)
             if face_mesh_results.multi_face_landmarks:
@@ -287,10 +326,10 @@ class ProctoringService:
         """
         try:
             height, width, _ = frame.shape
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            rgb_frame = self._to_rgb(frame)
             
             # Check lighting (convert to grayscale and check brightness)
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            gray = self._to_gray(frame)
             brightness = np.mean(gray)
             lighting_ok = 40 < brightness < 220  # Acceptable range
             
@@ -346,7 +385,7 @@ class ProctoringService:
                 return {'error': 'Invalid frame data'}
             
             height, width, _ = frame.shape
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            rgb_frame = self._to_rgb(frame)
             
             # Initialize result
             result = {
@@ -359,7 +398,7 @@ class ProctoringService:
                 'no_person': False,
                 'phone_detected': False,
                 'book_detected': False,
-                'snapshot_base64': None
+                'snapshot_jpeg': None  # raw JPEG bytes; base64 only where an HTTP response needs it
             }
             
             # Detect multiple faces first
@@ -380,7 +419,7 @@ class ProctoringService:
             else:
                 # No person detected - but check if frame is too dark/black (webcam off)
                 # Calculate frame brightness to avoid false positives when webcam is black
-                gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                gray_frame = self._to_gray(frame)
                 mean_brightness = np.mean(gray_frame)
                 BRIGHTNESS_THRESHOLD = 20  # If frame is too dark, don't flag as violation
                 
@@ -396,7 +435,7 @@ class ProctoringService:
                               cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
                 else:
                     # Frame is too dark - likely webcam is off/black, don't flag as violation
-                    logger.info(f"⚠️  Frame too dark (brightness: {mean_brightness:.1f}), skipping no_person violation")
+                    logger.debug("⚠️  Frame too dark (brightness: %.1f), skipping no_person violation", mean_brightness)
             
             # Process face mesh for head pose (only if single person detected)
             if result['face_count'] == 1:
@@ -452,7 +491,7 @@ class ProctoringService:
                 if (now_ts - last_ts) >= self.SNAPSHOT_INTERVAL_SEC:
                     annotated_frame = object_detection['annotated_frame']
                     _, buffer = cv2.imencode('.jpg', annotated_frame)
-                    result['snapshot_base64'] = base64.b64encode(buffer).decode('utf-8')
+                    result['snapshot_jpeg'] = buffer.tobytes()
                     self.last_snapshot_time_by_session[session_id] = now_ts
             
             return result
@@ -460,35 +499,5 @@ class ProctoringService:
         except Exception as e:
             return {'error': f'Frame processing error: {str(e)}'}
 
-    def calibrate_from_frame(self, frame_base64: str) -> Optional[Tuple[float, float]]:
-        """
-        Extract calibration values (pitch, yaw) from a frame
-        """
-        try:
-            # Decode base64 frame
-            frame_data = base64.b64decode(frame_base64.split(',')[1] if ',' in frame_base64 else frame_base64)
-            nparr = np.frombuffer(frame_data, np.uint8)
-            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            
-            if frame is None:
-                return None
-            
-            height, width, _ = frame.shape
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            
-            face_mesh_results = self.mp_face_mesh.process(rgb_frame)
-            if face_mesh_results.multi_face_landmarks:
-                landmarks = face_mesh_results.multi_face_landmarks[0].landmark
-                angles = self.estimate_head_pose(landmarks, width, height)
-                
-                if angles:
-                    pitch, yaw, _ = angles
-                    return (float(pitch), float(yaw))
-            
-            return None
-        except Exception as e:
-            print(f"Calibration error: {e}")
-            return None
-
 # Global instance
 proctoring_service = ProctoringService()
@@ -2,30 +2,66 @@
 FastAPI Server for AI Proctoring with WebSocket Support
 Integrates YOLOv8n and MediaPipe for real-time exam monitoring
 """
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, File, Form, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Dict, List
-import base64
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from typing import Dict, List, Optional, Tuple
+from collections import deque
+from itertools import islice
+import csv
+import html
+import io
+import httpx
 import cv2
 import numpy as np
 from datetime import datetime
 import asyncio
 import logging
-import json
+from logging.handlers import QueueHandler, QueueListener
+import queue
+import atexit
+import hashlib
+import hmac
+import secrets
+import orjson
 from supabase._sync.client import create_client
 from supabase._sync.client import SyncClient as Client
+from supabase.lib.client_options import ClientOptions
 import os
 from dotenv import load_dotenv
 from pathlib import Path
 import uuid
-import re
+import time
+from functools import lru_cache
+
+try:
+    # SIMD-accelerated base64 (drop-in for the stdlib API); snapshots and frames are decoded on every request
+    import pybase64 as base64
+except ImportError:
+    import base64
 
 # Load environment variables
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-from proctoring_service import ProctoringService
+# Configure logging
+# Records are handed to a queue and written to stderr by a listener thread, so log calls
+# on the frame/violation path never block the event loop on console I/O
+log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+log_handler = logging.StreamHandler()
+log_handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+log_listener = QueueListener(log_queue, log_handler)
+# The queue side only merges args into the message; level/name prefixing is done once, by log_handler
+queue_handler = QueueHandler(log_queue)
+queue_handler.setFormatter(logging.Formatter('%(message)s'))
+logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
+log_listener.start()
+atexit.register(log_listener.stop)
+logger = logging.getLogger(__name__)
+
+from proctoring_service import proctoring_service
 from grading_service import grading_service
+from evidence import SnapshotCache, evidence_object_path
 from models import (
     FrameProcessRequest,
     FrameProcessResponse,
@@ -33,15 +69,15 @@ from models import (
     CalibrationResponse,
     EnvironmentCheckRequest,
     EnvironmentCheck,
-    ViolationDetail
+    ViolationDetail,
+    SessionStats,
+    AverageStatistics,
+    AdminLoginRequest,
+    SnapshotUploadUrlRequest
 )
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
 # Initialize FastAPI
-app = FastAPI(title="AI Proctoring Service", version="1.0.0")
+app = FastAPI(title="AI Proctoring Service", version="1.0.0", default_response_class=ORJSONResponse)
 
 # Configure CORS
 app.add_middleware(
@@ -53,12 +89,26 @@ app.add_middleware(
 )
 
 # Initialize Supabase client
+# One client per process: its PostgREST and Storage sessions keep their HTTP connections
+# alive across requests. Timeouts are kept short so a stalled upload can't pin a worker thread.
 supabase_url = os.environ.get("SUPABASE_URL", "https://ukwnvvuqmiqrjlghgxnf.supabase.co")
 supabase_key = os.environ.get("SUPABASE_KEY", "")
-supabase: Client = create_client(supabase_url, supabase_key)
+SUPABASE_TIMEOUT_SEC = 10
+supabase: Client = create_client(
+    supabase_url,
+    supabase_key,
+    options=ClientOptions(
+        postgrest_client_timeout=SUPABASE_TIMEOUT_SEC,
+        storage_client_timeout=SUPABASE_TIMEOUT_SEC
+    )
+)
+# Bucket proxy for violation snapshots, built once instead of per upload/URL lookup
+evidence_bucket = supabase.storage.from_('violation-evidence')
 
-# Initialize Proctoring Service
-proctoring_service = ProctoringService()
+# Admin password is only held as a SHA-256 digest (set ADMIN_PASSWORD in the environment)
+_admin_password = os.environ.get("ADMIN_PASSWORD")
+ADMIN_PASSWORD_DIGEST = hashlib.sha256(_admin_password.encode()).digest() if _admin_password else None
+del _admin_password
 
 # Helper function to validate and convert UUID
 def validate_uuid(value):
@@ -74,34 +124,147 @@ def validate_uuid(value):
         logger.warning(f"Invalid UUID format: {value}, using None instead")
         return None
 
+@lru_cache(maxsize=1)
+def _iso_for(second: int) -> str:
+    """ISO-8601 UTC timestamp for a whole second, formatted once per second"""
+    return datetime.utcfromtimestamp(second).isoformat()
+
+@lru_cache(maxsize=1)
+def _file_stamp_for(second: int) -> str:
+    """Filename timestamp (YYYYmmdd_HHMMSS, UTC) for a whole second, formatted once per second"""
+    return datetime.utcfromtimestamp(second).strftime('%Y%m%d_%H%M%S')
+
+async def _execute(query):
+    """Run a blocking Supabase request in a worker thread so it doesn't stall the event loop"""
+    return await asyncio.to_thread(query.execute)
+
+async def _rpc_data(function: str, params: Optional[Dict] = None):
+    """Call a Postgres function through PostgREST and return its result"""
+    return (await _execute(supabase.rpc(function, params or {}))).data
+
+# A data URL header ("data:image/jpeg;base64,") always fits in this many characters
+DATA_URL_HEADER_MAX = 64
+
+def _decode_base64_image(data: str) -> bytes:
+    """Decode base64 image data given either as bare base64 or as a data URL"""
+    # Only the header can hold the comma, so bare base64 isn't scanned end to end
+    comma = data.find(',', 0, DATA_URL_HEADER_MAX)
+    return base64.b64decode(data[comma + 1:] if comma >= 0 else data)
+
+def _decode_frame(frame_base64: str):
+    """Decode a base64 (or data URL) JPEG frame into a BGR image, None if undecodable"""
+    nparr = np.frombuffer(_decode_base64_image(frame_base64), np.uint8)
+    return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
 # Active WebSocket connections
 active_connections: Dict[str, WebSocket] = {}
 
-def _upload_snapshot_and_get_url(
-    supabase: Client,
-    exam_id: str,
-    student_id: str,
-    violation_type: str,
-    snapshot_base64: str
-):
+async def _send_json(websocket: WebSocket, payload: Dict):
     """
-    Uploads a base64 JPEG snapshot to Supabase Storage bucket 'violation-evidence'
-    and returns a public URL. Returns None on failure.
+    Send a JSON message serialized once with orjson instead of stdlib json.
+    Sent as a text frame because the browser client JSON.parses event.data.
     """
+    await websocket.send_text(orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY).decode())
+
+# Most recent violations recorded by this process, newest first (serves /api/violations/recent)
+recent_violations: deque = deque(maxlen=500)
+
+# Short-lived cache for admin dashboard aggregates: {key: (computed_at, data)}
+ADMIN_CACHE_TTL_SEC = 5.0
+admin_cache: Dict[str, Tuple[float, object]] = {}
+# One lock per aggregate so a slow query only holds back requests for that same aggregate
+admin_cache_locks: Dict[str, asyncio.Lock] = {}
+# Bumped on every invalidation; a computation that started before a bump must not be cached
+admin_cache_generation = 0
+
+async def _cached_admin_query(key: str, compute):
+    """Return a cached admin aggregate, recomputing it (awaiting compute()) at most once per TTL"""
+    async with admin_cache_locks.setdefault(key, asyncio.Lock()):
+        now_ts = asyncio.get_event_loop().time()
+        cached = admin_cache.get(key)
+        if cached is not None and (now_ts - cached[0]) < ADMIN_CACHE_TTL_SEC:
+            return cached[1]
+        generation = admin_cache_generation
+        data = await compute()
+        if generation == admin_cache_generation:
+            admin_cache[key] = (now_ts, data)
+        return data
+
+def _record_violations(records: List[Dict]):
+    """Track newly inserted violations: feed the recent ring and drop stale dashboard aggregates"""
+    global admin_cache_generation
+    recent_violations.extendleft(records)
+    admin_cache_generation += 1
+    admin_cache.clear()
+
+# Snapshot proxy cache: violation_id -> (image bytes, content type), LRU bounded by total size
+SNAPSHOT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+snapshot_cache = SnapshotCache(SNAPSHOT_CACHE_MAX_BYTES)
+
+@app.on_event("startup")
+async def create_http_client():
+    # Shared keep-alive client so snapshot fetches reuse TLS connections to Supabase Storage;
+    # HTTP/2 multiplexes concurrent fetches over one connection instead of opening one each
+    app.state.http = httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=64),
+        timeout=10.0
+    )
+
+@app.on_event("startup")
+async def warmup_models():
+    # Pay model initialisation before accepting traffic instead of on the first student's frame
     try:
-        if not snapshot_base64:
-            return None
-        image_data = base64.b64decode(snapshot_base64.split(',')[1] if ',' in snapshot_base64 else snapshot_base64)
-        timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-        filename = f"{exam_id}/{student_id}_{violation_type}_{timestamp}.jpg"
-        # Upload
-        supabase.storage.from_('violation-evidence').upload(
+        await asyncio.get_event_loop().run_in_executor(None, proctoring_service.warmup)
+        logger.info("✅ Proctoring models warmed up")
+    except Exception as e:
+        logger.warning(f"Model warmup failed: {e}")
+
+@app.on_event("shutdown")
+async def close_http_client():
+    await app.state.http.aclose()
+
+# Caps concurrent Storage uploads so a burst of violations can't exhaust the worker threadpool
+UPLOAD_CONCURRENCY = 10
+upload_semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+
+async def _upload_evidence(filename: str, image_data: bytes) -> str:
+    """Upload a JPEG to the 'violation-evidence' bucket off the event loop and return its public URL"""
+    async with upload_semaphore:
+        await asyncio.to_thread(
+            evidence_bucket.upload,
             filename,
             image_data,
             file_options={"content-type": "image/jpeg"}
         )
-        public_url = supabase.storage.from_('violation-evidence').get_public_url(filename)
-        return public_url
+    return _evidence_public_url(filename)
+
+def _evidence_filename(exam_id: str, student_id: str, violation_type: str) -> str:
+    """Object path for a violation snapshot in the 'violation-evidence' bucket"""
+    timestamp = _file_stamp_for(int(time.time()))
+    # The timestamp only has second resolution; the random suffix keeps same-second uploads distinct
+    return f"{exam_id}/{student_id}_{violation_type}_{timestamp}_{secrets.token_hex(4)}.jpg"
+
+def _evidence_public_url(filename: str) -> str:
+    """Public URL of an evidence object; derived from its path, so it is known before the upload completes"""
+    return evidence_bucket.get_public_url(filename)
+
+# Public URL prefix of the evidence bucket; the snapshot proxy only ever fetches objects under it
+EVIDENCE_URL_PREFIX = _evidence_public_url("").split('?', 1)[0]
+
+def _evidence_object_path(image_url: str) -> Optional[str]:
+    """Object path in the evidence bucket for a stored image_url, None if it points anywhere else"""
+    return evidence_object_path(image_url, EVIDENCE_URL_PREFIX)
+
+async def _upload_snapshot_and_get_url(filename: str, snapshot_jpeg: bytes):
+    """
+    Uploads a JPEG snapshot to Supabase Storage bucket 'violation-evidence'
+    and returns a public URL. Returns None on failure.
+    """
+    try:
+        if not snapshot_jpeg:
+            return None
+        return await _upload_evidence(filename, snapshot_jpeg)
     except Exception as e:
         logger.error(f"Snapshot upload failed: {e}")
         return None
@@ -122,7 +285,7 @@ async def root():
 async def health_check():
     return {
         "status": "healthy",
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": _iso_for(int(time.time())),
         "models_loaded": proctoring_service.yolo_model is not None
     }
 
@@ -143,12 +306,11 @@ async def grade_exam(request: dict):
         
         logger.info(f"📝 Grading exam: exam_id={exam_id}, student_id={student_id}, answers={len(student_answers)}")
         
-        # Get questions with correct answers from Supabase
-        exam_response = supabase.table('exams').select('exam_template_id').eq('id', exam_id).single().execute()
-        exam_template_id = exam_response.data['exam_template_id']
-        
-        questions_response = supabase.table('exam_questions').select('question_number, correct_answer, points').eq('exam_template_id', exam_template_id).execute()
-        questions = questions_response.data
+        # Get questions with correct answers from Supabase (exam -> template -> questions in one round-trip)
+        answer_key = await _rpc_data('get_exam_grading_questions', {'p_exam_id': exam_id})
+        if not answer_key:
+            raise ValueError(f"Exam {exam_id} not found")
+        questions = answer_key['questions']
         
         # Grade the exam
         total_score, max_score, results = grading_service.grade_exam(student_answers, questions)
@@ -156,12 +318,12 @@ async def grade_exam(request: dict):
         grade_letter = grading_service.get_grade_letter(percentage)
         
         # Update exam with score
-        supabase.table('exams').update({
+        await _execute(supabase.table('exams').update({
             'total_score': total_score,
             'max_score': max_score,
             'graded': True,
             'graded_at': datetime.utcnow().isoformat()
-        }).eq('id', exam_id).execute()
+        }).eq('id', exam_id))
         
         logger.info(f"✅ Grading complete: {total_score}/{max_score} ({percentage}%) - Grade: {grade_letter}")
         
@@ -183,9 +345,7 @@ async def calibrate(request: CalibrationRequest):
     """Calibrate head pose for a student"""
     try:
         # Decode base64 frame
-        frame_data = base64.b64decode(request.frame_base64.split(',')[1] if ',' in request.frame_base64 else request.frame_base64)
-        nparr = np.frombuffer(frame_data, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        frame = _decode_frame(request.frame_base64)
         
         if frame is None:
             return CalibrationResponse(success=False, message="Invalid frame data")
@@ -214,9 +374,7 @@ async def check_environment(request: EnvironmentCheckRequest):
     """Check lighting and face detection for environment verification"""
     try:
         # Decode base64 frame
-        frame_data = base64.b64decode(request.frame_base64.split(',')[1] if ',' in request.frame_base64 else request.frame_base64)
-        nparr = np.frombuffer(frame_data, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        frame = _decode_frame(request.frame_base64)
         
         if frame is None:
             return EnvironmentCheck(
@@ -261,71 +419,116 @@ async def check_environment(request: EnvironmentCheckRequest):
             message=str(e)
         )
 
+def _run_frame_detection(frame, session_id: str, calibrated_pitch: float, calibrated_yaw: float) -> FrameProcessResponse:
+    """Run violation detection on a decoded frame and build the HTTP response"""
+    if frame is None:
+        raise HTTPException(status_code=400, detail="Invalid frame data")
+    
+    # Process frame
+    result = proctoring_service.process_frame(
+        frame,
+        session_id,
+        calibrated_pitch,
+        calibrated_yaw
+    )
+    
+    # Convert violations to response format
+    violations = [
+        ViolationDetail(
+            type=v['type'],
+            severity=v['severity'],
+            message=v['message'],
+            confidence=v.get('confidence')
+        )
+        for v in result['violations']
+    ]
+    
+    return FrameProcessResponse(
+        timestamp=result['timestamp'],
+        violations=violations,
+        head_pose=result.get('head_pose'),
+        face_count=result['face_count'],
+        looking_away=result['looking_away'],
+        multiple_faces=result['multiple_faces'],
+        no_person=result['no_person'],
+        phone_detected=result['phone_detected'],
+        book_detected=result['book_detected'],
+        snapshot_base64=base64.b64encode(result['snapshot_jpeg']).decode() if result.get('snapshot_jpeg') else None
+    )
+
 @app.post("/api/process-frame", response_model=FrameProcessResponse)
 async def process_frame(request: FrameProcessRequest):
     """Process a single frame for violations"""
     try:
         # Decode base64 frame
-        frame_data = base64.b64decode(request.frame_base64.split(',')[1] if ',' in request.frame_base64 else request.frame_base64)
-        nparr = np.frombuffer(frame_data, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if frame is None:
-            raise HTTPException(status_code=400, detail="Invalid frame data")
-        
-        # Process frame
-        result = proctoring_service.process_frame(
-            frame,
-            request.session_id,
-            request.calibrated_pitch,
-            request.calibrated_yaw
-        )
-        
-        # Convert violations to response format
-        violations = [
-            ViolationDetail(
-                type=v['type'],
-                severity=v['severity'],
-                message=v['message'],
-                confidence=v.get('confidence')
-            )
-            for v in result['violations']
-        ]
-        
-        return FrameProcessResponse(
-            timestamp=datetime.utcnow().isoformat(),
-            violations=violations,
-            head_pose=result.get('head_pose'),
-            face_count=result['face_count'],
-            looking_away=result['looking_away'],
-            multiple_faces=result['multiple_faces'],
-            no_person=result['no_person'],
-            phone_detected=result['phone_detected'],
-            book_detected=result['book_detected'],
-            snapshot_base64=result.get('snapshot_base64')
-        )
+        frame = _decode_frame(request.frame_base64)
+        return _run_frame_detection(frame, request.session_id, request.calibrated_pitch, request.calibrated_yaw)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Frame processing error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/process-frame-bin", response_model=FrameProcessResponse)
+async def process_frame_bin(
+    session_id: str = Form(...),
+    calibrated_pitch: float = Form(...),
+    calibrated_yaw: float = Form(...),
+    frame: UploadFile = File(...)
+):
+    """Process a raw JPEG frame sent as multipart/form-data (no base64 encoding or decoding)"""
+    try:
+        raw = await frame.read()
+        decoded = cv2.imdecode(np.frombuffer(raw, np.uint8), cv2.IMREAD_COLOR)
+        return _run_frame_detection(decoded, session_id, calibrated_pitch, calibrated_yaw)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Frame processing error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Exam status cache: {exam_id: (fetched_at, status)} so frame gating doesn't query per frame
+EXAM_STATUS_TTL_SEC = 15.0
+exam_status_cache: Dict[str, Tuple[float, Optional[str]]] = {}
+
+async def _is_exam_completed(exam_id: Optional[str]) -> bool:
+    """Check (with a short TTL cache) whether the exam a frame belongs to is already completed"""
+    try:
+        exam_id = str(uuid.UUID(str(exam_id)))
+    except (ValueError, AttributeError, TypeError):
+        return False
+    now_ts = asyncio.get_event_loop().time()
+    cached = exam_status_cache.get(exam_id)
+    if cached is None or (now_ts - cached[0]) >= EXAM_STATUS_TTL_SEC:
+        try:
+            exam = await _execute(supabase.table('exams').select('status').eq('id', exam_id))
+            status = exam.data[0].get('status') if exam.data else None
+        except Exception as e:
+            logger.warning(f"Exam status lookup failed: {e}")
+            status = None
+        if len(exam_status_cache) >= 1000:
+            exam_status_cache.clear()
+        cached = (now_ts, status)
+        exam_status_cache[exam_id] = cached
+    return cached[1] == 'completed'
+
 # Violation cooldown tracking: prevent duplicate violations of same type
 # Format: {session_id: {violation_type: last_timestamp}}
 violation_cooldowns: Dict[str, Dict[str, float]] = {}
 VIOLATION_COOLDOWN_SEC = 10.0  # Don't log same violation type within 10 seconds
+AUDIO_THRESHOLD = 30  # Lowered threshold for excessive noise to improve sensitivity
 
 @app.websocket("/api/ws/proctoring/{session_id}")
 async def websocket_proctoring(websocket: WebSocket, session_id: str):
     """WebSocket endpoint for real-time proctoring"""
-    print(f"🔌 WebSocket connection attempt for session: {session_id}")
     logger.info(f"🔌 WebSocket connection attempt for session: {session_id}")
     await websocket.accept()
     active_connections[session_id] = websocket
-    print(f"✅ WebSocket connected and accepted: {session_id}")
     logger.info(f"✅ WebSocket connected: {session_id}")
     
-    # Initialize cooldown tracking for this session
-    if session_id not in violation_cooldowns:
-        violation_cooldowns[session_id] = {}
+    # Initialize cooldown tracking for this session. The handler keeps its own reference, so it
+    # never depends on the shared entry, which a reconnect for the same session also uses
+    cooldowns = violation_cooldowns.setdefault(session_id, {})
     
     try:
         # Throttle: only process a frame every 2 seconds per connection
@@ -334,164 +537,210 @@ async def websocket_proctoring(websocket: WebSocket, session_id: str):
         while True:
             # Receive frame data from client
             data = await websocket.receive_text()
-            message = json.loads(data)
-            logger.info(f"📥 Received message type: {message.get('type')}")
+            # orjson parses the multi-hundred-KB base64 frame messages several times faster than json
+            message = orjson.loads(data)
+            logger.debug("📥 Received message type: %s", message.get('type'))
             
             if message['type'] == 'frame':
                 student_name = message.get('student_name', 'Unknown')
                 student_id = message.get('student_id', 'Unknown')
-                logger.info(f"🎥 Processing frame from student: name='{student_name}', id='{student_id}'")
+                logger.debug("🎥 Processing frame from student: name='%s', id='%s'", student_name, student_id)
                 # Throttle processing to every 2 seconds
                 now_ts = asyncio.get_event_loop().time()
                 if (now_ts - last_processed_time) >= FRAME_INTERVAL_SEC:
                     last_processed_time = now_ts
+                    # Stray frames of a completed exam skip decoding and inference entirely
+                    if await _is_exam_completed(message.get('exam_id')):
+                        await _send_json(websocket, {
+                            'type': 'detection_skipped',
+                            'data': {
+                                'reason': 'session_completed',
+                                'timestamp': _iso_for(int(time.time()))
+                            }
+                        })
+                        continue
                     # Process frame
                     try:
-                        frame_data = base64.b64decode(message['frame'].split(',')[1] if ',' in message['frame'] else message['frame'])
-                        logger.info(f"📦 Frame data decoded: {len(frame_data)} bytes")
+                        frame_data = _decode_base64_image(message['frame'])
+                        logger.debug("📦 Frame data decoded: %d bytes", len(frame_data))
                         nparr = np.frombuffer(frame_data, np.uint8)
                         frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                        logger.info(f"🖼️  Frame decode result: {frame is not None}")
+                        logger.debug("🖼️  Frame decode result: %s", frame is not None)
                     except Exception as decode_err:
                         logger.error(f"❌ Frame decode error: {decode_err}")
                         frame = None
                     
                     if frame is not None:
-                        logger.info(f"🔍 Frame decoded successfully: {frame.shape}, Calibration: pitch={message.get('calibrated_pitch', 0.0)}, yaw={message.get('calibrated_yaw', 0.0)}")
+                        logger.debug("🔍 Frame decoded successfully: %s, Calibration: pitch=%s, yaw=%s", frame.shape, message.get('calibrated_pitch', 0.0), message.get('calibrated_yaw', 0.0))
                         result = proctoring_service.process_frame(
                             frame,
                             session_id,
                             message.get('calibrated_pitch', 0.0),
                             message.get('calibrated_yaw', 0.0)
                         )
-                        logger.info(f"🎯 Detection result: {len(result.get('violations', []))} violations found")
-                        logger.info(f"📊 Detection details: faces={result.get('face_count', 0)}, no_person={result.get('no_person', False)}, multiple={result.get('multiple_faces', False)}, looking_away={result.get('looking_away', False)}, phone={result.get('phone_detected', False)}, book={result.get('book_detected', False)}")
-                        # Persist violations with snapshot evidence
-                        try:
-                            exam_id = message.get('exam_id')
-                            student_id = message.get('student_id')
-                            student_name = message.get('student_name')
-                            subject_code = message.get('subject_code', '')
-                            subject_name = message.get('subject_name', '')
-                            logger.info(f"📋 Extracted from message: exam_id={exam_id}, student_id={student_id}, student_name='{student_name}', subject='{subject_name}' ({subject_code})")
-                            snapshot_b64 = result.get('snapshot_base64')
-                            # If there are violations, upload snapshot and insert rows
-                            if result.get('violations'):
-                                logger.info(f"💾 Saving {len(result['violations'])} violations to database with student_name='{student_name}'...")
-                                image_url = None
-                                # Upload once and reuse URL for all violations in this frame
-                                if snapshot_b64:
-                                    logger.info(f"📸 Uploading snapshot for violation...")
-                                    image_url = _upload_snapshot_and_get_url(
-                                        supabase, exam_id or "unknown_exam", student_id or "unknown_student",
-                                        result['violations'][0]['type'], snapshot_b64
-                                    )
-                                    logger.info(f"✅ Snapshot uploaded: {image_url}")
+                        # Per-frame trace is debug-only; skip building it entirely unless someone is listening
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug("🎯 Detection result: %d violations found", len(result.get('violations', [])))
+                            logger.debug(
+                                "📊 Detection details: faces=%s, no_person=%s, multiple=%s, looking_away=%s, phone=%s, book=%s",
+                                result.get('face_count', 0), result.get('no_person', False), result.get('multiple_faces', False),
+                                result.get('looking_away', False), result.get('phone_detected', False), result.get('book_detected', False)
+                            )
+                        exam_id = message.get('exam_id')
+                        student_id = message.get('student_id')
+                        student_name = message.get('student_name')
+                        subject_code = message.get('subject_code', '')
+                        subject_name = message.get('subject_name', '')
+                        logger.debug("📋 Extracted from message: exam_id=%s, student_id=%s, student_name='%s', subject='%s' (%s)", exam_id, student_id, student_name, subject_name, subject_code)
+                        # The JPEG bytes are uploaded as-is and never sent back to the student; the
+                        # client gets the evidence URL, which is fixed by the object path before the upload runs
+                        snapshot_jpeg = result.pop('snapshot_jpeg', None)
+                        snapshot_name = None
+                        if result.get('violations') and snapshot_jpeg:
+                            snapshot_name = _evidence_filename(
+                                exam_id or "unknown_exam", student_id or "unknown_student",
+                                result['violations'][0]['type']
+                            )
+                        # The URL is only published with the violation alerts, once the upload has succeeded
+                        result['snapshot_url'] = None
+
+                        async def persist_violations():
+                            """Upload the snapshot and insert this frame's violations, returning the snapshot URL"""
+                            image_url = None
+                            try:
+                                # If there are violations, upload snapshot and insert rows
+                                if result.get('violations'):
+                                    logger.info(f"💾 Saving {len(result['violations'])} violations to database with student_name='{student_name}'...")
+                                    # Upload once and reuse URL for all violations in this frame
+                                    if snapshot_name:
+                                        logger.info(f"📸 Uploading snapshot for violation...")
+                                        image_url = await _upload_snapshot_and_get_url(snapshot_name, snapshot_jpeg)
+                                        logger.info(f"✅ Snapshot uploaded: {image_url}")
+                                    else:
+                                        logger.warning("⚠️ No snapshot available for violation")
+                                    # Insert one record per violation type (with cooldown check)
+                                    now_ts = asyncio.get_event_loop().time()
+                                    frame_timestamp = result['timestamp']
+                                    violation_records = []
+                                    for v in result['violations']:
+                                        violation_type = v.get("type")
+                                        
+                                        # Check cooldown: skip if same violation type was logged recently
+                                        last_violation_time = cooldowns.get(violation_type, 0)
+                                        if (now_ts - last_violation_time) < VIOLATION_COOLDOWN_SEC:
+                                            logger.info(f"⏸️  Violation {violation_type} skipped (cooldown: {VIOLATION_COOLDOWN_SEC}s)")
+                                            continue
+                                        
+                                        # Update cooldown timestamp
+                                        cooldowns[violation_type] = now_ts
+                                        
+                                        violation_records.append({
+                                            "id": str(uuid.uuid4()),
+                                            "exam_id": validate_uuid(exam_id),
+                                            "student_id": validate_uuid(student_id),
+                                            "violation_type": violation_type,
+                                            "severity": v.get("severity"),
+                                            "details": {
+                                                "message": v.get("message"),
+                                                "confidence": v.get("confidence"),
+                                                "session_id": session_id,
+                                                "student_name": student_name,
+                                                "student_id": student_id,
+                                                "subject_code": subject_code,
+                                                "subject_name": subject_name,
+                                            },
+                                            "image_url": image_url,
+                                            "timestamp": frame_timestamp
+                                        })
+                                    # Insert all violations of this frame in a single round-trip
+                                    if violation_records:
+                                        try:
+                                            await _execute(supabase.table('violations').insert(violation_records))
+                                            _record_violations(violation_records)
+                                            logger.info(f"✅ {len(violation_records)} violation(s) saved: {', '.join(r['violation_type'] for r in violation_records)}")
+                                        except Exception as db_err:
+                                            logger.error(f"❌ Insert violation failed: {db_err}")
                                 else:
-                                    logger.warning("⚠️ No snapshot available for violation")
-                                # Insert one record per violation type (with cooldown check)
-                                now_ts = asyncio.get_event_loop().time()
-                                for v in result['violations']:
-                                    violation_type = v.get("type")
-                                    
-                                    # Check cooldown: skip if same violation type was logged recently
-                                    last_violation_time = violation_cooldowns[session_id].get(violation_type, 0)
-                                    if (now_ts - last_violation_time) < VIOLATION_COOLDOWN_SEC:
-                                        logger.info(f"⏸️  Violation {violation_type} skipped (cooldown: {VIOLATION_COOLDOWN_SEC}s)")
-                                        continue
-                                    
-                                    # Update cooldown timestamp
-                                    violation_cooldowns[session_id][violation_type] = now_ts
-                                    
-                                    violation_record = {
-                                        "id": str(uuid.uuid4()),
-                                        "exam_id": validate_uuid(exam_id),
-                                        "student_id": validate_uuid(student_id),
-                                        "violation_type": violation_type,
-                                        "severity": v.get("severity"),
-                                        "details": {
-                                            "message": v.get("message"),
-                                            "confidence": v.get("confidence"),
-                                            "session_id": session_id,
-                                            "student_name": student_name,
-                                            "student_id": student_id,
-                                            "subject_code": subject_code,
-                                            "subject_name": subject_name,
-                                        },
-                                        "image_url": image_url,
-                                        "timestamp": datetime.utcnow().isoformat()
-                                    }
-                                    try:
-                                        supabase.table('violations').insert(violation_record).execute()
-                                        logger.info(f"✅ Violation saved: {violation_type} - {v.get('message')}")
-                                    except Exception as db_err:
-                                        logger.error(f"❌ Insert violation failed: {db_err}")
-                            else:
-                                logger.info("✅ No violations detected in this frame")
-                        except Exception as persist_err:
-                            logger.error(f"❌ Persisting violation failed: {persist_err}")
-                        # Send results back to client
-                        await websocket.send_json({
-                            'type': 'detection_result',
-                            'data': result
-                        })
-                        logger.info(f"📤 Detection result sent to client")
-                        
-                        # Also send individual violation alerts to frontend
+                                    logger.info("✅ No violations detected in this frame")
+                            except Exception as persist_err:
+                                logger.error(f"❌ Persisting violation failed: {persist_err}")
+                            return image_url
+
+                        async def notify_client():
+                            """Send the detection result to the student"""
+                            await _send_json(websocket, {
+                                'type': 'detection_result',
+                                'data': result
+                            })
+                            logger.debug("📤 Detection result sent to client")
+
+                        # The detection result doesn't wait on the Storage upload and DB insert round-trips.
+                        # A failed send is re-raised only after persistence finishes, so a disconnect
+                        # mid-frame still stores the evidence before the session is cleaned up.
+                        image_url, send_error = await asyncio.gather(
+                            persist_violations(), notify_client(), return_exceptions=True
+                        )
+                        if isinstance(send_error, BaseException):
+                            raise send_error
+                        if isinstance(image_url, BaseException):
+                            raise image_url
+
+                        # Also send individual violation alerts to frontend, with the uploaded snapshot (or null)
                         if result.get('violations'):
                             for v in result['violations']:
-                                await websocket.send_json({
+                                await _send_json(websocket, {
                                     'type': 'violation',
                                     'data': {
                                         'type': v.get('type'),
                                         'severity': v.get('severity'),
                                         'message': v.get('message'),
                                         'confidence': v.get('confidence'),
-                                        'timestamp': datetime.utcnow().isoformat()
+                                        'timestamp': result['timestamp'],
+                                        'snapshot_url': image_url
                                     }
                                 })
-                                logger.info(f"🚨 Violation alert sent to frontend: {v.get('type')}")
+                                logger.debug("🚨 Violation alert sent to frontend: %s", v.get('type'))
                     else:
                         logger.error("❌ Frame is None - could not decode image data")
-                        await websocket.send_json({
+                        await _send_json(websocket, {
                             'type': 'error',
                             'data': {'message': 'Failed to decode frame image'}
                         })
                 else:
                     # Optionally inform client that frame was skipped due to throttle
-                    await websocket.send_json({
+                    await _send_json(websocket, {
                         'type': 'detection_skipped',
                         'data': {
                             'reason': 'throttled',
                             'interval_sec': FRAME_INTERVAL_SEC,
-                            'timestamp': datetime.utcnow().isoformat()
+                            'timestamp': _iso_for(int(time.time()))
                         }
                     })
                     
             elif message['type'] == 'audio':
                 # Process audio level
                 audio_level = message.get('audio_level', 0)
+                audio_timestamp = datetime.utcnow().isoformat()
                 logger.info(f"🎤 Received audio level: {audio_level}%")
                 # Always echo current audio level so UI can update in real-time
-                await websocket.send_json({
+                await _send_json(websocket, {
                     'type': 'audio_level',
                     'data': {
                         'level': float(audio_level),
-                        'timestamp': datetime.utcnow().isoformat()
+                        'timestamp': audio_timestamp
                     }
                 })
                 # Record a violation if audio exceeds threshold (adjusted to be more sensitive)
                 try:
-                    AUDIO_THRESHOLD = 30  # Lowered threshold for excessive noise to improve sensitivity
                     if audio_level >= AUDIO_THRESHOLD:
                         # Check cooldown for audio violations
                         now_ts = asyncio.get_event_loop().time()
-                        last_audio_violation = violation_cooldowns[session_id].get('excessive_noise', 0)
+                        last_audio_violation = cooldowns.get('excessive_noise', 0)
                         if (now_ts - last_audio_violation) < VIOLATION_COOLDOWN_SEC:
                             logger.info(f"⏸️  Audio violation skipped (cooldown: {VIOLATION_COOLDOWN_SEC}s)")
                         else:
                             # Update cooldown
-                            violation_cooldowns[session_id]['excessive_noise'] = now_ts
+                            cooldowns['excessive_noise'] = now_ts
                             
                             exam_id = message.get('exam_id')
                             student_id = message.get('student_id')
@@ -503,13 +752,13 @@ async def websocket_proctoring(websocket: WebSocket, session_id: str):
                             if not student_name or student_name == 'Unknown Student':
                                 try:
                                     if exam_id and validate_uuid(exam_id):
-                                        exam_data = supabase.table('exams').select('*, students(name)').eq('id', exam_id).execute()
+                                        exam_data = await _execute(supabase.table('exams').select('student_id, students(name)').eq('id', exam_id))
                                         if exam_data.data and len(exam_data.data) > 0:
                                             exam = exam_data.data[0]
                                             if exam.get('students') and exam['students'].get('name'):
                                                 student_name = exam['students']['name']
                                             elif exam.get('student_id') and validate_uuid(exam.get('student_id')):
-                                                student_data = supabase.table('students').select('name').eq('id', exam['student_id']).execute()
+                                                student_data = await _execute(supabase.table('students').select('name').eq('id', exam['student_id']))
                                                 if student_data.data and len(student_data.data) > 0:
                                                     student_name = student_data.data[0].get('name', 'Unknown Student')
                                 except Exception as lookup_err:
@@ -545,19 +794,20 @@ async def websocket_proctoring(websocket: WebSocket, session_id: str):
                                     "subject_name": subject_name,
                                 },
                                 "image_url": None,  # No snapshot for audio violations
-                                "timestamp": datetime.utcnow().isoformat()
+                                "timestamp": audio_timestamp
                             }
-                            supabase.table('violations').insert(violation_record).execute()
+                            await _execute(supabase.table('violations').insert(violation_record))
+                            _record_violations([violation_record])
                             logger.info(f"✅ Audio violation saved: {severity_msg} - {audio_level}%")
                             
-                            await websocket.send_json({
+                            await _send_json(websocket, {
                                 'type': 'violation',
                                 'data': {
                                     'type': 'excessive_noise',
                                     'severity': severity,
                                     'message': f'{severity_msg} - {audio_level:.0f}%',
                                     'audio_level': audio_level,
-                                    'timestamp': datetime.utcnow().isoformat()
+                                    'timestamp': audio_timestamp
                                 }
                             })
                 except Exception as e:
@@ -576,12 +826,13 @@ async def websocket_proctoring(websocket: WebSocket, session_id: str):
                     
                     # Check cooldown for browser activity violations
                     now_ts = asyncio.get_event_loop().time()
-                    last_browser_violation = violation_cooldowns[session_id].get(violation_type, 0)
+                    last_browser_violation = cooldowns.get(violation_type, 0)
                     if (now_ts - last_browser_violation) < VIOLATION_COOLDOWN_SEC:
                         logger.info(f"⏸️  Browser activity violation {violation_type} skipped (cooldown: {VIOLATION_COOLDOWN_SEC}s)")
                     else:
                         # Update cooldown
-                        violation_cooldowns[session_id][violation_type] = now_ts
+                        cooldowns[violation_type] = now_ts
+                        browser_timestamp = datetime.utcnow().isoformat()
                         
                         # Save browser activity violation to database (NO snapshot for browser activity)
                         violation_record = {
@@ -599,18 +850,19 @@ async def websocket_proctoring(websocket: WebSocket, session_id: str):
                                 "subject_name": subject_name or "N/A",
                             },
                             "image_url": None,  # No snapshot for browser activity
-                            "timestamp": datetime.utcnow().isoformat()
+                            "timestamp": browser_timestamp
                         }
-                        supabase.table('violations').insert(violation_record).execute()
+                        await _execute(supabase.table('violations').insert(violation_record))
+                        _record_violations([violation_record])
                         
                         # Send violation alert back to client for real-time UI update
-                        await websocket.send_json({
+                        await _send_json(websocket, {
                             'type': 'violation',
                             'data': {
                                 'type': violation_type,
                                 'severity': 'medium',
                                 'message': violation_message,
-                                'timestamp': datetime.utcnow().isoformat()
+                                'timestamp': browser_timestamp
                             }
                         })
                         logger.info(f"Browser activity violation recorded: {violation_type} for student {student_id}")
@@ -618,46 +870,36 @@ async def websocket_proctoring(websocket: WebSocket, session_id: str):
                     logger.error(f"Browser activity violation insert failed: {e}")
                     
             elif message['type'] == 'ping':
-                await websocket.send_json({'type': 'pong'})
+                await _send_json(websocket, {'type': 'pong'})
                 
     except WebSocketDisconnect:
         logger.info(f"WebSocket disconnected: {session_id}")
-        if session_id in active_connections:
-            del active_connections[session_id]
-        # Clean up cooldown tracking
-        if session_id in violation_cooldowns:
-            del violation_cooldowns[session_id]
     except Exception as e:
         logger.error(f"WebSocket error for {session_id}: {e}")
-        if session_id in active_connections:
-            del active_connections[session_id]
+    finally:
+        # Single O(1) cleanup for every exit path; if a newer socket for the same session has
+        # registered, its connection and cooldown state are left in place
+        if active_connections.get(session_id) is websocket:
+            active_connections.pop(session_id, None)
+            violation_cooldowns.pop(session_id, None)
 
 @app.post("/api/upload-violation-snapshot")
 async def upload_violation_snapshot(
-    exam_id: str,
-    student_id: str,
-    student_name: str,
-    violation_type: str,
-    snapshot_base64: str
+    exam_id: str = Form(...),
+    student_id: str = Form(...),
+    student_name: str = Form(...),
+    violation_type: str = Form(...),
+    snapshot: UploadFile = File(...)
 ):
-    """Upload violation snapshot to Supabase Storage"""
+    """Upload a raw JPEG violation snapshot (multipart/form-data) to Supabase Storage"""
     try:
-        # Decode base64 image
-        image_data = base64.b64decode(snapshot_base64.split(',')[1] if ',' in snapshot_base64 else snapshot_base64)
+        image_data = await snapshot.read()
         
         # Generate filename
-        timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-        filename = f"{exam_id}/{student_id}_{violation_type}_{timestamp}.jpg"
+        filename = _evidence_filename(exam_id, student_id, violation_type)
         
-        # Upload to Supabase Storage
-        response = supabase.storage.from_('violation-evidence').upload(
-            filename,
-            image_data,
-            file_options={"content-type": "image/jpeg"}
-        )
-        
-        # Get public URL
-        public_url = supabase.storage.from_('violation-evidence').get_public_url(filename)
+        # Upload to Supabase Storage and get public URL
+        public_url = await _upload_evidence(filename, image_data)
         
         return {
             "success": True,
@@ -668,6 +910,40 @@ async def upload_violation_snapshot(
         logger.error(f"Upload error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/upload-violation-snapshot/signed-url")
+async def create_snapshot_upload_url(request: SnapshotUploadUrlRequest):
+    """
+    Issue a signed upload URL for a browser-captured snapshot. The object path is chosen and
+    validated here, and the JPEG goes straight to Supabase Storage without passing through
+    this server. The exam must be in progress and belong to the student. Store the returned
+    public_url on the violation.
+    """
+    # These become the object path, so only accept UUIDs and a plain violation type (no '/' or '..')
+    exam_id = validate_uuid(request.exam_id)
+    student_id = validate_uuid(request.student_id)
+    if not exam_id or not student_id:
+        raise HTTPException(status_code=400, detail="Invalid exam or student id")
+    violation_type = request.violation_type
+    if not (violation_type.isascii() and violation_type.replace('_', '').replace('-', '').isalnum() and len(violation_type) <= 64):
+        raise HTTPException(status_code=400, detail="Invalid violation type")
+    # Only the student taking a running exam may upload evidence into its folder
+    exam = await _execute(supabase.table('exams').select('student_id, status').eq('id', exam_id))
+    if not exam.data or exam.data[0].get('student_id') != student_id or exam.data[0].get('status') != 'in_progress':
+        raise HTTPException(status_code=403, detail="Exam is not in progress for this student")
+    try:
+        filename = _evidence_filename(exam_id, student_id, violation_type)
+        signed = await asyncio.to_thread(evidence_bucket.create_signed_upload_url, filename)
+        return {
+            "success": True,
+            "upload_url": signed["signed_url"],
+            "token": signed["token"],
+            "filename": filename,
+            "public_url": _evidence_public_url(filename)
+        }
+    except Exception as e:
+        logger.error(f"Signed upload URL error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/api/violations")
 async def create_violation(violation_data: dict):
     """Create a violation record in Supabase"""
@@ -684,7 +960,8 @@ async def create_violation(violation_data: dict):
             "timestamp": datetime.utcnow().isoformat()
         }
         
-        result = supabase.table('violations').insert(violation_record).execute()
+        result = await _execute(supabase.table('violations').insert(violation_record))
+        _record_violations([violation_record])
         
         return {
             "success": True,
@@ -696,8 +973,14 @@ async def create_violation(violation_data: dict):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/violations")
-async def get_violations(exam_id: str = None, student_id: str = None):
-    """Get violations from Supabase"""
+async def get_violations(
+    exam_id: str = None,
+    student_id: str = None,
+    evidence_only: bool = False,
+    offset: int = 0,
+    limit: int = 50
+):
+    """Get a page of violations from Supabase, newest first (evidence_only: only rows with a snapshot image)"""
     try:
         query = supabase.table('violations').select('*')
         
@@ -705,17 +988,230 @@ async def get_violations(exam_id: str = None, student_id: str = None):
             query = query.eq('exam_id', exam_id)
         if student_id:
             query = query.eq('student_id', student_id)
+        if evidence_only:
+            # Filter in the database so evidence-less rows never leave Supabase
+            query = query.not_.is_('image_url', 'null')
             
-        result = query.order('timestamp', desc=True).execute()
+        offset = max(offset, 0)
+        limit = min(max(limit, 1), 500)
+        result = await _execute(query.order('timestamp', desc=True).range(offset, offset + limit - 1))
         
         return {
             "success": True,
-            "violations": result.data
+            "violations": result.data,
+            "offset": offset,
+            "limit": limit
         }
     except Exception as e:
         logger.error(f"Error fetching violations: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/violations/recent")
+async def get_recent_violations(limit: int = 50):
+    """Get the most recent violations recorded by this server, served from memory"""
+    limit = min(max(limit, 1), recent_violations.maxlen)
+    return {
+        "success": True,
+        "violations": list(islice(recent_violations, 0, limit))
+    }
+
+@app.get("/api/violations/{violation_id}/snapshot")
+async def get_violation_snapshot(violation_id: str):
+    """Serve a violation's evidence image through the backend's pooled connection"""
+    if not validate_uuid(violation_id):
+        raise HTTPException(status_code=400, detail="Invalid violation id")
+    cached = snapshot_cache.get(violation_id)
+    if cached is not None:
+        content, content_type = cached
+        return Response(content=content, media_type=content_type)
+    try:
+        result = await _execute(supabase.table('violations').select('image_url').eq('id', violation_id))
+        image_url = result.data[0].get('image_url') if result.data else None
+        # image_url is client-supplied via POST /api/violations: only fetch objects in the
+        # evidence bucket, rebuilding the URL from the object path, never an arbitrary host
+        object_path = _evidence_object_path(image_url) if image_url else None
+        if not object_path:
+            raise HTTPException(status_code=404, detail="Snapshot not found")
+        
+        response = await app.state.http.get(_evidence_public_url(object_path))
+        if response.status_code != 200:
+            raise HTTPException(status_code=502, detail=f"Snapshot fetch failed: {response.status_code}")
+        
+        content_type = response.headers.get('content-type', 'image/jpeg')
+        snapshot_cache.put(violation_id, response.content, content_type)
+        return Response(content=response.content, media_type=content_type)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching snapshot: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/admin/login")
+async def admin_login(request: AdminLoginRequest):
+    """Verify the admin password with a constant-time digest comparison"""
+    if ADMIN_PASSWORD_DIGEST is None:
+        raise HTTPException(status_code=503, detail="Admin login is not configured")
+    supplied = hashlib.sha256(request.password.encode()).digest()
+    if not hmac.compare_digest(supplied, ADMIN_PASSWORD_DIGEST):
+        raise HTTPException(status_code=401, detail="Invalid password")
+    return {"success": True}
+
+@app.get("/api/admin/stats", response_model=SessionStats)
+async def get_admin_stats():
+    """Get dashboard session/violation counts in a single database round-trip"""
+    try:
+        stats = await _cached_admin_query('stats', lambda: _rpc_data('get_admin_stats'))
+        return SessionStats(**stats)
+    except Exception as e:
+        logger.error(f"Error fetching admin stats: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/admin/statistics/average", response_model=AverageStatistics)
+async def get_average_statistics():
+    """Get per-student and per-exam averages, aggregated in the database"""
+    try:
+        stats = await _cached_admin_query('average', lambda: _rpc_data('get_average_statistics'))
+        total_students = stats['total_students']
+        return AverageStatistics(
+            avg_violations_per_student=round(stats['total_violations'] / total_students, 2) if total_students else 0.0,
+            avg_exam_duration_minutes=round(stats['avg_exam_duration_minutes'], 2),
+            avg_violation_types={
+                violation_type: round(count / total_students, 2) if total_students else 0.0
+                for violation_type, count in stats['violation_type_counts'].items()
+            },
+            total_students=total_students,
+            total_sessions=stats['total_sessions']
+        )
+    except Exception as e:
+        logger.error(f"Error fetching average statistics: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/admin/students-with-violations")
+async def get_students_with_violations():
+    """Get a per-student violation summary, grouped in the database, most violations first"""
+    try:
+        students = await _cached_admin_query(
+            'students_with_violations',
+            lambda: _rpc_data('get_students_with_violations')
+        )
+        return {
+            "success": True,
+            "students": students
+        }
+    except Exception as e:
+        logger.error(f"Error fetching students with violations: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/admin/violations/timeline")
+async def get_violations_timeline(limit: int = 100):
+    """Get violation counts in 5-minute bins (most recent `limit` bins), binned in the database"""
+    try:
+        timeline = await _rpc_data('get_violations_timeline', {'p_limit': min(max(limit, 1), 1000)})
+        return {
+            "success": True,
+            "timeline": timeline
+        }
+    except Exception as e:
+        logger.error(f"Error fetching violations timeline: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+EXPORT_PAGE_SIZE = 500
+VIOLATION_CSV_COLUMNS = [
+    'id', 'timestamp', 'exam_id', 'student_id', 'student_name',
+    'violation_type', 'severity', 'message', 'image_url'
+]
+
+def _iter_violation_pages(exam_id: Optional[str], student_id: Optional[str]):
+    """Yield violations (newest first) one page at a time so memory stays bounded by one page
+
+    Pages are fetched with a (timestamp, id) keyset cursor rather than an offset, so each
+    page is an index range scan and rows inserted mid-export are not duplicated or skipped.
+    """
+    last = None
+    while True:
+        query = supabase.table('violations').select(
+            'id, timestamp, exam_id, student_id, violation_type, severity, details, image_url'
+        )
+        if exam_id:
+            query = query.eq('exam_id', exam_id)
+        if student_id:
+            query = query.eq('student_id', student_id)
+        if last:
+            ts, row_id = last['timestamp'], last['id']
+            query = query.or_(f'timestamp.lt."{ts}",and(timestamp.eq."{ts}",id.gt.{row_id})')
+        rows = query.order('timestamp', desc=True).order('id').limit(EXPORT_PAGE_SIZE).execute().data
+        if rows:
+            yield rows
+        if len(rows) < EXPORT_PAGE_SIZE:
+            break
+        last = rows[-1]
+
+def _iter_violation_csv(exam_id: Optional[str], student_id: Optional[str]):
+    """Yield a violations CSV page by page"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(VIOLATION_CSV_COLUMNS)
+    # Header goes out on its own so an export with no matching rows is still a valid CSV
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate(0)
+    for rows in _iter_violation_pages(exam_id, student_id):
+        for row in rows:
+            details = row.get('details') or {}
+            writer.writerow([
+                row['id'], row['timestamp'], row['exam_id'], row['student_id'],
+                details.get('student_name', ''), row['violation_type'], row['severity'],
+                details.get('message', ''), row.get('image_url') or ''
+            ])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+def _iter_violation_report_html(student_id: str):
+    """Yield a student's violation report as HTML page by page; evidence is linked by URL, never inlined"""
+    yield (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>Violation Report</title></head><body>'
+        f'<h1>Violation Report</h1><p>Student ID: {html.escape(student_id)}</p>'
+        '<table border="1" cellpadding="4"><tr><th>Time</th><th>Type</th><th>Severity</th>'
+        '<th>Message</th><th>Evidence</th></tr>'
+    )
+    for rows in _iter_violation_pages(None, student_id):
+        parts = []
+        for row in rows:
+            details = row.get('details') or {}
+            image_url = row.get('image_url')
+            evidence = f'<img src="{html.escape(image_url)}" width="160" loading="lazy">' if image_url else ''
+            parts.append(
+                f"<tr><td>{html.escape(str(row['timestamp']))}</td><td>{html.escape(row['violation_type'])}</td>"
+                f"<td>{html.escape(str(row['severity']))}</td><td>{html.escape(str(details.get('message', '')))}</td>"
+                f"<td>{evidence}</td></tr>"
+            )
+        yield ''.join(parts)
+    yield '</table></body></html>'
+
+@app.get("/api/admin/violations/export.csv")
+async def export_violations_csv(exam_id: str = None, student_id: str = None):
+    """Stream violations as CSV; rows are fetched and written one page at a time"""
+    # Validate before streaming: once the 200 headers are sent, a query error can only truncate the file
+    if exam_id and not validate_uuid(exam_id):
+        raise HTTPException(status_code=400, detail="Invalid exam id")
+    if student_id and not validate_uuid(student_id):
+        raise HTTPException(status_code=400, detail="Invalid student id")
+    filename = f"violations_{_file_stamp_for(int(time.time()))}.csv"
+    # A sync generator is iterated in Starlette's threadpool, keeping the blocking client off the event loop
+    return StreamingResponse(
+        _iter_violation_csv(exam_id, student_id),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@app.get("/api/admin/students/{student_id}/report.html")
+async def export_student_report_html(student_id: str):
+    """Stream a student's violation report as HTML, one page of violations at a time"""
+    if not validate_uuid(student_id):
+        raise HTTPException(status_code=400, detail="Invalid student id")
+    return StreamingResponse(_iter_violation_report_html(student_id), media_type="text/html")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
@@ -30,6 +30,9 @@ TEST_STUDENT_NAME = "John Doe"
 # Initialize Supabase client for verification
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+# Shared HTTP session so the endpoint checks reuse one keep-alive TLS connection
+http = requests.Session()
+
 def create_test_image_base64():
     """Create a simple test image in base64 format"""
     # Create a simple 100x100 black image
@@ -47,7 +50,7 @@ def test_basic_endpoints():
     
     # Test root endpoint
     try:
-        response = requests.get(f"{BACKEND_URL}/", timeout=10)
+        response = http.get(f"{BACKEND_URL}/", timeout=10)
         if response.status_code == 200:
             try:
                 json_data = response.json()
@@ -61,7 +64,7 @@ def test_basic_endpoints():
     
     # Test health endpoint
     try:
-        response = requests.get(f"{BACKEND_URL}/health", timeout=10)
+        response = http.get(f"{BACKEND_URL}/health", timeout=10)
         if response.status_code == 200:
             try:
                 json_data = response.json()
@@ -78,20 +81,20 @@ def test_basic_endpoints():
     except Exception as e:
         print(f"❌ Health endpoint failed: {e}")
     
+    test_image = create_test_image_base64()
+    
     # Test environment check
     try:
-        test_image = create_test_image_base64()
         payload = {"frame_base64": test_image}
-        response = requests.post(f"{BACKEND_URL}/api/environment-check", json=payload, timeout=10)
+        response = http.post(f"{BACKEND_URL}/api/environment-check", json=payload, timeout=10)
         print(f"✅ Environment check: {response.status_code} - {response.json()}")
     except Exception as e:
         print(f"❌ Environment check failed: {e}")
     
     # Test calibration
     try:
-        test_image = create_test_image_base64()
         payload = {"frame_base64": test_image}
-        response = requests.post(f"{BACKEND_URL}/api/calibrate", json=payload, timeout=10)
+        response = http.post(f"{BACKEND_URL}/api/calibrate", json=payload, timeout=10)
         print(f"✅ Calibration: {response.status_code} - {response.json()}")
     except Exception as e:
         print(f"❌ Calibration failed: {e}")
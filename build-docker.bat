@@ -37,7 +37,7 @@ if %ERRORLEVEL% EQU 0 (
     echo ✅ Docker image built successfully!
     echo.
     echo To run the container:
-    echo   docker run -d -p 80:80 --name exameye-shield -e SUPABASE_URL=your-url -e SUPABASE_KEY=your-key exameye-shield:latest
+    echo   docker run -d -p 80:80 --name exameye-shield -e SUPABASE_URL=your-url -e SUPABASE_KEY=your-key -e ADMIN_PASSWORD=your-admin-password exameye-shield:latest
     echo.
     echo Or use docker-compose:
     echo   docker-compose up -d
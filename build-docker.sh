@@ -40,6 +40,7 @@ echo "To run the container:"
 echo "  docker run -d -p 80:80 --name exameye-shield \\"
 echo "    -e SUPABASE_URL=your-supabase-url \\"
 echo "    -e SUPABASE_KEY=your-supabase-key \\"
+echo "    -e ADMIN_PASSWORD=your-admin-password \\"
 echo "    exameye-shield:latest"
 echo ""
 echo "Or use docker-compose:"
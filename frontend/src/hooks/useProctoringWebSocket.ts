@@ -7,7 +7,7 @@ interface ViolationData {
   message: string;
   confidence?: number;
   timestamp: string;
-  snapshot_base64?: string;
+  snapshot_url?: string | null;
 }
 
 interface DetectionResult {
@@ -19,7 +19,7 @@ interface DetectionResult {
   no_person: boolean;
   phone_detected: boolean;
   book_detected: boolean;
-  snapshot_base64?: string;
+  snapshot_url?: string | null;
 }
 
 interface UseProctoringWebSocketOptions {
@@ -107,7 +107,7 @@ export const useProctoringWebSocket = ({
                 onViolationRef.current({
                   ...violation,
                   timestamp: new Date().toISOString(),
-                  snapshot_base64: result.snapshot_base64,
+                  snapshot_url: result.snapshot_url,
                 });
               });
             }
@@ -9,10 +9,29 @@ import { supabase } from "@/integrations/supabase/client";
 import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer } from 'recharts';
 import { pdfGenerator } from "@/utils/pdfGenerator";
 
+const API_URL = import.meta.env.VITE_PROCTORING_API_URL || 'http://localhost:8001';
+
+// Dashboard aggregates are computed in the database and served (cached) by the backend
+const fetchAdminData = async (path: string) => {
+  const response = await fetch(`${API_URL}${path}`);
+  if (!response.ok) throw new Error(`${path} failed: ${response.status}`);
+  return response.json();
+};
+
+// Full violation rows are only loaded when a report or export actually needs them
+const fetchViolations = async (studentId?: string) => {
+  let query = supabase.from('violations').select('*');
+  if (studentId) query = query.eq('student_id', studentId);
+  const { data, error } = await query.order('timestamp', { ascending: false });
+  if (error) throw error;
+  return data || [];
+};
+
 const AdminDashboard = () => {
   const navigate = useNavigate();
-  const [examSessions, setExamSessions] = useState<any[]>([]);
-  const [violations, setViolations] = useState<any[]>([]);
+  const [recentViolations, setRecentViolations] = useState<any[]>([]);
+  const [evidenceViolations, setEvidenceViolations] = useState<any[]>([]);
+  const [evidenceCount, setEvidenceCount] = useState(0);
   const [stats, setStats] = useState({
     totalSessions: 0,
     activeNow: 0,
@@ -35,6 +54,16 @@ const AdminDashboard = () => {
 
     loadDashboardData();
 
+    // Real-time changes drive all refreshes; a burst of events triggers a single reload
+    let reloadTimer: ReturnType<typeof setTimeout> | null = null;
+    const scheduleReload = () => {
+      if (reloadTimer) return;
+      reloadTimer = setTimeout(() => {
+        reloadTimer = null;
+        loadDashboardData();
+      }, 1000);
+    };
+
     // Real-time subscriptions
     const violationSubscription = supabase
       .channel('violations-channel')
@@ -43,7 +72,7 @@ const AdminDashboard = () => {
         (payload) => {
           console.log('New violation:', payload);
           toast.error('New violation detected!');
-          loadDashboardData();
+          scheduleReload();
         }
       )
       .subscribe();
@@ -53,16 +82,13 @@ const AdminDashboard = () => {
       .on('postgres_changes',
         { event: '*', schema: 'public', table: 'exams' },
         () => {
-          loadDashboardData();
+          scheduleReload();
         }
       )
       .subscribe();
 
-    // Auto-refresh every 10 seconds
-    const interval = setInterval(loadDashboardData, 10000);
-
     return () => {
-      clearInterval(interval);
+      if (reloadTimer) clearTimeout(reloadTimer);
       supabase.removeChannel(violationSubscription);
       supabase.removeChannel(examsSubscription);
     };
@@ -70,246 +96,63 @@ const AdminDashboard = () => {
 
   const loadDashboardData = async () => {
     try {
-      const { data: examsData, error: examsError } = await supabase
-        .from('exams')
-        .select(`
-          *,
-          students (
-            name,
-            email,
-            student_id
-          ),
-          exam_templates (
-            subject_name,
-            subject_code
-          )
-        `)
-        .order('started_at', { ascending: false });
-
-      if (examsError) throw examsError;
-
-      // Fetch all violations - don't require foreign key joins (allow NULLs)
-      const { data: violationsData } = await supabase
-        .from('violations')
-        .select('*')
-        .order('timestamp', { ascending: false });
-
-      setViolations(violationsData || []);
-
-      // Calculate stats
-      const activeCount = (examsData || []).filter(e => e.status === 'in_progress').length;
-      const completedCount = (examsData || []).filter(e => e.status === 'completed').length;
-      const totalViolations = violationsData?.length || 0;
-      const totalStudents = new Set((examsData || []).map(e => e.student_id)).size;
-      
-      const avgViolations = totalStudents > 0 ? (totalViolations / totalStudents).toFixed(1) : 0;
-      
-      const completedExams = (examsData || []).filter(e => e.status === 'completed' && e.started_at && e.completed_at);
-      const avgDuration = completedExams.length > 0
-        ? Math.round(completedExams.reduce((sum, e) => {
-            const start = new Date(e.started_at).getTime();
-            const end = new Date(e.completed_at).getTime();
-            return sum + (end - start) / 1000 / 60;
-          }, 0) / completedExams.length)
-        : 0;
+      const violationColumns = 'id, exam_id, student_id, violation_type, timestamp, image_url, details, students(name)';
+      const [adminStats, averages, timeline, students, recent, evidence] = await Promise.all([
+        fetchAdminData('/api/admin/stats'),
+        fetchAdminData('/api/admin/statistics/average'),
+        fetchAdminData('/api/admin/violations/timeline?limit=10'),
+        fetchAdminData('/api/admin/students-with-violations'),
+        supabase
+          .from('violations')
+          .select(violationColumns)
+          .order('timestamp', { ascending: false })
+          .limit(10),
+        supabase
+          .from('violations')
+          .select(violationColumns, { count: 'exact' })
+          .not('image_url', 'is', null)
+          .order('timestamp', { ascending: false })
+          .limit(8),
+      ]);
+
+      if (recent.error) throw recent.error;
+      if (evidence.error) throw evidence.error;
 
       setStats({
-        totalSessions: examsData?.length || 0,
-        activeNow: activeCount,
-        completed: completedCount,
-        totalViolations,
-        avgViolationsPerStudent: Number(avgViolations),
-        avgExamDuration: avgDuration,
-        totalStudents,
+        totalSessions: adminStats.total_sessions,
+        activeNow: adminStats.active_sessions,
+        completed: adminStats.completed_sessions,
+        totalViolations: adminStats.total_violations,
+        avgViolationsPerStudent: Number(averages.avg_violations_per_student.toFixed(1)),
+        avgExamDuration: Math.round(averages.avg_exam_duration_minutes),
+        totalStudents: averages.total_students,
       });
 
-      setExamSessions(examsData || []);
-      prepareChartData(violationsData || []);
-      groupViolationsByStudent(examsData || [], violationsData || []);
+      setChartData((timeline.timeline || []).map((bin: any) => ({
+        time: new Date(bin.timestamp).toLocaleTimeString('en-US', { hour: '2-digit', minute: '2-digit', hour12: true }),
+        violations: bin.count,
+      })));
+
+      setStudentsWithViolations((students.students || []).map((row: any) => ({
+        id: row.student_id,
+        name: row.student_name || 'Unknown Student',
+        studentId: row.student_code || row.student_id,
+        examId: row.latest_exam_id,
+        violationCount: row.violation_count,
+        violationTypes: row.violation_types || [],
+        subjectName: row.subject_name || 'N/A',
+        subjectCode: row.subject_code || 'N/A',
+      })));
+
+      setRecentViolations(recent.data || []);
+      setEvidenceViolations(evidence.data || []);
+      setEvidenceCount(evidence.count || 0);
 
     } catch (error) {
       console.error('Error loading dashboard data:', error);
     }
   };
 
-  const prepareChartData = (violations: any[]) => {
-    const hourlyData: { [key: string]: number } = {};
-    
-    violations.forEach(v => {
-      const time = new Date(v.timestamp);
-      const hourKey = time.toLocaleTimeString('en-US', { hour: '2-digit', minute: '2-digit', hour12: true });
-      hourlyData[hourKey] = (hourlyData[hourKey] || 0) + 1;
-    });
-
-    const data = Object.entries(hourlyData)
-      .map(([time, violations]) => ({ time, violations }))
-      .slice(-10);
-
-    setChartData(data);
-  };
-
-  const groupViolationsByStudent = (exams: any[], violations: any[]) => {
-    const studentMap: { [key: string]: any } = {};
-
-    // Helper to normalize student name for matching
-    const normalizeName = (name: string) => (name || '').toLowerCase().trim();
-    
-    // Helper to extract student info from violation
-    const getStudentInfo = (violation: any) => {
-      const studentId = violation.student_id || violation.details?.student_id || 'unknown';
-      const studentName = violation.details?.student_name || violation.student_name || 'Unknown Student';
-      const subjectCode = violation.details?.subject_code || '';
-      return { studentId, studentName, subjectCode, normalizedName: normalizeName(studentName) };
-    };
-
-    // First pass: Group violations by student name (primary) and student_id (secondary)
-    violations.forEach(violation => {
-      const { studentId, studentName, subjectCode, normalizedName } = getStudentInfo(violation);
-      
-      // Skip if no valid student name
-      if (normalizedName === '' || normalizedName === 'unknown student') {
-        return;
-      }
-      
-      // Create a key that combines normalized name and student_id for better matching
-      const mapKey = `${normalizedName}_${studentId}`;
-      
-      if (!studentMap[mapKey]) {
-        // Try to find exam data for this student by multiple criteria
-        let exam = null;
-        
-        // 1. Try to find by student_id (UUID match)
-        if (studentId && studentId !== 'unknown' && studentId.length > 10) {
-          exam = exams.find(e => {
-            const examStudentId = e.students?.id || e.student_id || '';
-            return examStudentId === studentId || 
-                   (e.students?.student_id && e.students.student_id === studentId);
-          });
-        }
-        
-        // 2. Try to find by student name
-        if (!exam) {
-          exam = exams.find(e => {
-            const examStudentName = e.students?.name || '';
-            return normalizeName(examStudentName) === normalizedName;
-          });
-        }
-        
-        // 3. Try to find by subject code from violation details
-        if (!exam && subjectCode) {
-          exam = exams.find(e => {
-            const examSubjectCode = e.exam_templates?.subject_code || e.subject_code || '';
-            const examStudentName = e.students?.name || '';
-            return examSubjectCode === subjectCode && 
-                   normalizeName(examStudentName) === normalizedName;
-          });
-        }
-        
-        // 4. Try to find by student_id text match (for non-UUID student_ids)
-        if (!exam && studentId && studentId !== 'unknown') {
-          exam = exams.find(e => {
-            const examStudentId = e.students?.student_id || e.student_id || '';
-            return examStudentId === studentId || 
-                   examStudentId.toString() === studentId.toString();
-          });
-        }
-        
-        // 5. Last resort: find any exam with matching subject code
-        if (!exam && subjectCode) {
-          exam = exams.find(e => {
-            const examSubjectCode = e.exam_templates?.subject_code || e.subject_code || '';
-            return examSubjectCode === subjectCode;
-          });
-        }
-        
-        // Determine the best student ID to use
-        let bestStudentId = studentId;
-        let bestId = studentId;
-        
-        if (exam) {
-          bestStudentId = exam.students?.student_id || exam.student_id || studentId;
-          bestId = exam.students?.id || exam.id || studentId;
-        } else {
-          // Try to find student in students table by name
-          // Note: We don't have direct access to students table here,
-          // but we can use the student_id from violation if it's a valid UUID
-          if (studentId && studentId.length > 20) {
-            bestId = studentId; // Likely a UUID
-          }
-        }
-        
-        studentMap[mapKey] = {
-          name: exam?.students?.name || studentName,
-          studentId: bestStudentId,
-          id: bestId, // Use student UUID or exam id
-          examId: exam?.id, // Store exam id for View Report navigation
-          violationCount: 0,
-          violationTypes: [],
-          violations: [],
-          subjectName: exam?.exam_templates?.subject_name || exam?.subject_name || violation.details?.subject_name || 'N/A',
-          subjectCode: exam?.exam_templates?.subject_code || exam?.subject_code || subjectCode || 'N/A',
-        };
-      }
-      
-      studentMap[mapKey].violationCount++;
-      if (!studentMap[mapKey].violationTypes.includes(violation.violation_type)) {
-        studentMap[mapKey].violationTypes.push(violation.violation_type);
-      }
-      studentMap[mapKey].violations.push(violation);
-    });
-
-    // Second pass: Merge students with same name but different IDs
-    const mergedMap: { [key: string]: any } = {};
-    Object.values(studentMap).forEach((student: any) => {
-      const normalizedName = normalizeName(student.name);
-      
-      if (!mergedMap[normalizedName]) {
-        mergedMap[normalizedName] = { ...student };
-      } else {
-        // Merge violations and types
-        mergedMap[normalizedName].violations = [
-          ...mergedMap[normalizedName].violations,
-          ...student.violations
-        ];
-        mergedMap[normalizedName].violationCount += student.violationCount;
-        student.violationTypes.forEach((type: string) => {
-          if (!mergedMap[normalizedName].violationTypes.includes(type)) {
-            mergedMap[normalizedName].violationTypes.push(type);
-          }
-        });
-        
-        // Prefer exam data if available (prioritize the one with examId)
-        if (student.examId && !mergedMap[normalizedName].examId) {
-          mergedMap[normalizedName].examId = student.examId;
-          mergedMap[normalizedName].id = student.id;
-          mergedMap[normalizedName].studentId = student.studentId;
-          mergedMap[normalizedName].subjectName = student.subjectName;
-          mergedMap[normalizedName].subjectCode = student.subjectCode;
-        } else if (student.subjectCode && student.subjectCode !== 'N/A' && mergedMap[normalizedName].subjectCode === 'N/A') {
-          // Update subject info if we have better data
-          mergedMap[normalizedName].subjectName = student.subjectName;
-          mergedMap[normalizedName].subjectCode = student.subjectCode;
-        }
-      }
-    });
-
-    // Sort violations by timestamp (most recent first)
-    Object.values(mergedMap).forEach((student: any) => {
-      student.violations.sort((a: any, b: any) => {
-        const timeA = new Date(a.timestamp || 0).getTime();
-        const timeB = new Date(b.timestamp || 0).getTime();
-        return timeB - timeA;
-      });
-    });
-
-    // Filter out entries with no violations (shouldn't happen, but safety check)
-    const validStudents = Object.values(mergedMap).filter((student: any) => 
-      student.violations && student.violations.length > 0
-    );
-
-    setStudentsWithViolations(validStudents);
-  };
-
   const handleLogout = () => {
     sessionStorage.removeItem('adminAuth');
     toast.success("Logged out");
@@ -318,14 +161,14 @@ const AdminDashboard = () => {
 
   const handleExportCSV = async (student: any) => {
     try {
-      const csvContent = await pdfGenerator.exportToCSV(student.violations);
+      const studentViolations = await fetchViolations(student.id);
+      const csvContent = await pdfGenerator.exportToCSV(studentViolations);
       const blob = new Blob([csvContent], { type: 'text/csv' });
       const url = window.URL.createObjectURL(blob);
       const a = document.createElement('a');
       
       // Use actual student name from violations if available
-      const actualStudentName = student.violations?.[0]?.details?.student_name || 
-                               student.violations?.[0]?.student_name || 
+      const actualStudentName = studentViolations[0]?.details?.student_name || 
                                student.name || 
                                'Unknown_Student';
       const sanitizedName = actualStudentName.replace(/\s+/g, '_').replace(/[^a-zA-Z0-9_-]/g, '');
@@ -342,16 +185,16 @@ const AdminDashboard = () => {
   const handleGenerateReport = async (student: any) => {
     try {
       toast.info("Generating PDF report...");
+      const studentViolations = await fetchViolations(student.id);
       // Ensure we use the correct student name from violations if available
-      const actualStudentName = student.violations?.[0]?.details?.student_name || 
-                               student.violations?.[0]?.student_name || 
+      const actualStudentName = studentViolations[0]?.details?.student_name || 
                                student.name || 
                                'Unknown Student';
       
       const pdfUrl = await pdfGenerator.generateStudentReport(
         actualStudentName,
         student.studentId,
-        student.violations,
+        studentViolations,
         student.subjectName,
         student.subjectCode
       );
@@ -366,7 +209,7 @@ const AdminDashboard = () => {
 
   const handleExportAllCSV = async () => {
     try {
-      const csvContent = await pdfGenerator.exportToCSV(violations);
+      const csvContent = await pdfGenerator.exportToCSV(await fetchViolations());
       const blob = new Blob([csvContent], { type: 'text/csv' });
       const url = window.URL.createObjectURL(blob);
       const a = document.createElement('a');
@@ -555,15 +398,12 @@ const AdminDashboard = () => {
               <div className="flex items-center gap-2">
                 <Eye className="w-5 h-5" />
                 <h2 className="text-xl font-bold">Recent Violation Evidence Gallery</h2>
-                <Badge variant="secondary">{violations.filter(v => v.image_url).length} Images</Badge>
+                <Badge variant="secondary">{evidenceCount} Images</Badge>
               </div>
             </div>
             
             <div className="grid grid-cols-2 md:grid-cols-4 gap-4">
-              {violations
-                .filter(v => v.image_url)
-                .slice(0, 8)
-                .map((violation) => (
+              {evidenceViolations.map((violation) => (
                   <div key={violation.id} className="relative group">
                     <div className="aspect-video rounded-lg overflow-hidden border-2 border-border hover:border-red-500 transition-colors">
                       <img 
@@ -583,8 +423,7 @@ const AdminDashboard = () => {
                     <div className="mt-2">
                       <p className="text-xs font-medium">
                         {violation.details?.student_name || 
-                         violation.student_name || 
-                         (violation.exam_id ? examSessions.find(e => e.id === violation.exam_id)?.students?.name : null) ||
+                         violation.students?.name ||
                          'Unknown Student'}
                       </p>
                       <p className="text-xs text-muted-foreground">
@@ -595,7 +434,7 @@ const AdminDashboard = () => {
                 ))}
             </div>
 
-            {violations.filter(v => v.image_url).length === 0 && (
+            {evidenceViolations.length === 0 && (
               <div className="text-center py-12 text-muted-foreground">
                 No violation evidence images found
               </div>
@@ -643,46 +482,7 @@ const AdminDashboard = () => {
                         <Button 
                           size="sm" 
                           variant="default" 
-                          onClick={() => {
-                            // Helper function for name normalization
-                            const normalizeName = (name: string) => (name || '').toLowerCase().trim();
-                            
-                            // Find exam by examId stored in student object, or by matching student_id/name
-                            let examId = student.examId;
-                            
-                            if (!examId) {
-                              // Try to find exam by student_id
-                              examId = examSessions.find(e => 
-                                e.student_id === student.studentId || 
-                                e.students?.student_id === student.studentId ||
-                                e.students?.id === student.id
-                              )?.id;
-                            }
-                            
-                            if (!examId) {
-                              // Try to find by student name
-                              examId = examSessions.find(e => 
-                                normalizeName(e.students?.name || '') === normalizeName(student.name)
-                              )?.id;
-                            }
-                            
-                            if (!examId && student.subjectCode && student.subjectCode !== 'N/A') {
-                              // Try to find by subject code and student name
-                              examId = examSessions.find(e => {
-                                const examSubjectCode = e.exam_templates?.subject_code || e.subject_code || '';
-                                const examStudentName = e.students?.name || '';
-                                return examSubjectCode === student.subjectCode && 
-                                       normalizeName(examStudentName) === normalizeName(student.name);
-                              })?.id;
-                            }
-                            
-                            // Use student.id (UUID) if available, otherwise student.studentId
-                            const studentIdForReport = student.id && student.id.length > 20 
-                              ? student.id 
-                              : (student.studentId !== 'unknown' ? student.studentId : student.id);
-                            
-                            navigate(`/admin/student-report?studentId=${studentIdForReport}&examId=${examId || ''}`);
-                          }}
+                          onClick={() => navigate(`/admin/student-report?studentId=${student.id}&examId=${student.examId || ''}`)}
                         >
                           <Eye className="w-4 h-4 mr-1" />
                           View Report
@@ -722,11 +522,10 @@ const AdminDashboard = () => {
               <CardContent className="p-6">
                 <h2 className="text-xl font-bold mb-6">Recent Activity</h2>
                 <div className="space-y-3">
-                  {violations.slice(0, 10).map((violation) => {
+                  {recentViolations.map((violation) => {
                     // Try multiple sources for student name
                     const studentName = violation.details?.student_name || 
-                                      violation.student_name || 
-                                      (violation.exam_id ? examSessions.find(e => e.id === violation.exam_id)?.students?.name : null) ||
+                                      violation.students?.name ||
                                       'Unknown Student';
                     
                     return (
@@ -739,7 +538,7 @@ const AdminDashboard = () => {
                       </div>
                     );
                   })}
-                  {violations.length === 0 && (
+                  {recentViolations.length === 0 && (
                     <p className="text-center text-muted-foreground py-8">No recent activity</p>
                   )}
                 </div>
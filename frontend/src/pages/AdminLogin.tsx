@@ -12,22 +12,32 @@ const AdminLogin = () => {
   const [password, setPassword] = useState("");
   const [loading, setLoading] = useState(false);
 
-  const handleLogin = (e: React.FormEvent) => {
+  const handleLogin = async (e: React.FormEvent) => {
     e.preventDefault();
     
     setLoading(true);
 
-    // Simple password check (in production, use proper authentication)
-    setTimeout(() => {
-      if (password === "vinay") {
+    // Password is verified by the backend (constant-time digest comparison)
+    try {
+      const apiUrl = import.meta.env.VITE_PROCTORING_API_URL || 'http://localhost:8001';
+      const response = await fetch(`${apiUrl}/api/admin/login`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ password }),
+      });
+      if (response.ok) {
         sessionStorage.setItem('adminAuth', 'true');
         toast.success("Login successful!");
         navigate('/admin/dashboard');
       } else {
         toast.error("Invalid password");
       }
+    } catch (error) {
+      console.error('Admin login error:', error);
+      toast.error("Could not reach the server");
+    } finally {
       setLoading(false);
-    }, 500);
+    }
   };
 
   return (
@@ -56,26 +56,31 @@ export class ViolationLogger {
       const response = await fetch(imageDataUrl);
       const blob = await response.blob();
       
-      // Organize by student name
-      const sanitizedName = studentName.replace(/\s+/g, '_').replace(/[^a-zA-Z0-9_-]/g, '');
-      const timestamp = new Date().toISOString().replace(/:/g, '-').split('.')[0];
-      const fileName = `${sanitizedName}/${examId}/${violationType}_${timestamp}.jpg`;
+      // The backend picks and validates the object path and signs a one-off upload for it
+      const apiUrl = import.meta.env.VITE_PROCTORING_API_URL || 'http://localhost:8001';
+      const ticketResponse = await fetch(`${apiUrl}/api/upload-violation-snapshot/signed-url`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+          exam_id: examId,
+          student_id: studentId,
+          violation_type: violationType
+        })
+      });
+      if (!ticketResponse.ok) {
+        throw new Error(`Signed upload URL request failed: ${ticketResponse.status}`);
+      }
+      const { filename, token, public_url: publicUrl } = await ticketResponse.json();
       
-      const { data, error } = await supabase.storage
+      const { error } = await supabase.storage
         .from('violation-evidence')
-        .upload(fileName, blob, {
+        .uploadToSignedUrl(filename, token, blob, {
           contentType: 'image/jpeg',
-          cacheControl: '3600',
-          upsert: false
+          cacheControl: '3600'
         });
 
       if (error) throw error;
 
-      // Get public URL
-      const { data: { publicUrl } } = supabase.storage
-        .from('violation-evidence')
-        .getPublicUrl(fileName);
-
       return publicUrl;
     } catch (error) {
       console.error('Error uploading snapshot:', error);
@@ -91,7 +96,7 @@ export class ViolationLogger {
     snapshot: string
   ) {
     try {
-      // Upload snapshot with student name
+      // Upload snapshot
       const imageUrl = await this.uploadSnapshot(
         examId,
         studentId,
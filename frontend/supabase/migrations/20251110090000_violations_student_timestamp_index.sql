@@ -0,0 +1,5 @@
+-- Composite index for per-student violation/evidence lookups
+-- Serves "WHERE student_id = ? ORDER BY timestamp DESC" (optionally filtered on image_url)
+-- straight from the index instead of sorting every violation of the student
+CREATE INDEX IF NOT EXISTS idx_violations_student_timestamp
+ON public.violations(student_id, timestamp DESC);
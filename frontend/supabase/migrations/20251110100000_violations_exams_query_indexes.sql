@@ -0,0 +1,10 @@
+-- Indexes backing the backend's violation and exam lookups
+
+-- GET /api/violations?exam_id=... orders by timestamp; the composite index
+-- returns rows already sorted instead of sorting all of an exam's violations
+CREATE INDEX IF NOT EXISTS idx_violations_exam_timestamp
+ON public.violations(exam_id, timestamp DESC);
+
+-- Exam lookups by status (in_progress / completed) for session gating and dashboards
+CREATE INDEX IF NOT EXISTS idx_exams_status
+ON public.exams(status);
@@ -0,0 +1,16 @@
+-- Dashboard counters in a single round-trip
+-- Replaces one count query per counter with a single scan of exams using FILTER clauses
+CREATE OR REPLACE FUNCTION public.get_admin_stats()
+RETURNS json
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+  SELECT json_build_object(
+    'total_sessions', count(*),
+    'active_sessions', count(*) FILTER (WHERE status = 'in_progress'),
+    'completed_sessions', count(*) FILTER (WHERE status = 'completed'),
+    'total_violations', (SELECT count(*) FROM public.violations)
+  )
+  FROM public.exams;
+$$;
@@ -0,0 +1,26 @@
+-- Use the planner's row estimate for the unfiltered violation total
+-- count(*) over violations is a full scan of the largest table on every dashboard refresh;
+-- pg_class.reltuples is maintained by autovacuum/ANALYZE and read in O(1).
+-- Falls back to an exact count while the table has never been analyzed (reltuples = -1).
+-- exams is already scanned once for the filtered counters, so its total stays exact.
+CREATE OR REPLACE FUNCTION public.get_admin_stats()
+RETURNS json
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+  SELECT json_build_object(
+    'total_sessions', count(*),
+    'active_sessions', count(*) FILTER (WHERE status = 'in_progress'),
+    'completed_sessions', count(*) FILTER (WHERE status = 'completed'),
+    'total_violations', (
+      SELECT CASE
+        WHEN c.reltuples >= 0 THEN c.reltuples::bigint
+        ELSE (SELECT count(*) FROM public.violations)
+      END
+      FROM pg_class c
+      WHERE c.oid = 'public.violations'::regclass
+    )
+  )
+  FROM public.exams;
+$$;
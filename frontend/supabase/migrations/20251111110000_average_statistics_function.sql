@@ -0,0 +1,30 @@
+-- Dashboard averages aggregated inside Postgres
+-- Returns one small JSON document instead of every exam and violation row
+CREATE OR REPLACE FUNCTION public.get_average_statistics()
+RETURNS json
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+  WITH session_agg AS (
+    SELECT
+      count(*) AS total_sessions,
+      count(DISTINCT student_id) AS total_students,
+      avg(EXTRACT(EPOCH FROM (completed_at - started_at)) / 60.0)
+        FILTER (WHERE status = 'completed' AND started_at IS NOT NULL AND completed_at IS NOT NULL) AS avg_duration
+    FROM public.exams
+  ),
+  type_counts AS (
+    SELECT violation_type, count(*) AS c
+    FROM public.violations
+    GROUP BY violation_type
+  )
+  SELECT json_build_object(
+    'total_sessions', s.total_sessions,
+    'total_students', s.total_students,
+    'avg_exam_duration_minutes', COALESCE(s.avg_duration, 0),
+    'total_violations', COALESCE((SELECT sum(c) FROM type_counts), 0),
+    'violation_type_counts', COALESCE((SELECT json_object_agg(violation_type, c) FROM type_counts), '{}'::json)
+  )
+  FROM session_agg s;
+$$;
@@ -0,0 +1,28 @@
+-- One row per student with violations, grouped inside Postgres
+-- Only the per-student summary (latest snapshot URL, not the images) crosses the wire
+CREATE OR REPLACE FUNCTION public.get_students_with_violations()
+RETURNS TABLE (
+  student_id UUID,
+  student_name TEXT,
+  violation_count BIGINT,
+  violation_types TEXT[],
+  latest_snapshot_url TEXT,
+  latest_violation TIMESTAMP WITH TIME ZONE
+)
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+  SELECT
+    v.student_id,
+    COALESCE(max(s.name), (array_agg(v.details->>'student_name' ORDER BY v.timestamp DESC))[1]) AS student_name,
+    count(*) AS violation_count,
+    array_agg(DISTINCT v.violation_type) AS violation_types,
+    (array_agg(v.image_url ORDER BY v.timestamp DESC) FILTER (WHERE v.image_url IS NOT NULL))[1] AS latest_snapshot_url,
+    max(v.timestamp) AS latest_violation
+  FROM public.violations v
+  LEFT JOIN public.students s ON s.id = v.student_id
+  WHERE v.student_id IS NOT NULL
+  GROUP BY v.student_id
+  ORDER BY violation_count DESC;
+$$;
@@ -0,0 +1,37 @@
+-- Per-student statistics with hourly violation buckets computed by date_trunc
+-- Returns O(hours) buckets instead of every violation row of the student
+CREATE OR REPLACE FUNCTION public.get_student_statistics(p_student_id UUID)
+RETURNS json
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+  WITH student_violations AS (
+    SELECT violation_type, timestamp
+    FROM public.violations
+    WHERE student_id = p_student_id
+  ),
+  session_agg AS (
+    SELECT
+      count(*) AS total_sessions,
+      avg(EXTRACT(EPOCH FROM (completed_at - started_at)) / 60.0)
+        FILTER (WHERE started_at IS NOT NULL AND completed_at IS NOT NULL) AS avg_duration
+    FROM public.exams
+    WHERE student_id = p_student_id
+  )
+  SELECT json_build_object(
+    'student_name', (SELECT name FROM public.students WHERE id = p_student_id),
+    'total_violations', (SELECT count(*) FROM student_violations),
+    'total_sessions', s.total_sessions,
+    'avg_session_duration_minutes', COALESCE(s.avg_duration, 0),
+    'violation_breakdown', COALESCE((
+      SELECT json_object_agg(violation_type, c)
+      FROM (SELECT violation_type, count(*) AS c FROM student_violations GROUP BY violation_type) by_type
+    ), '{}'::json),
+    'violations_over_time', COALESCE((
+      SELECT json_agg(json_build_object('timestamp', hour, 'count', c) ORDER BY hour)
+      FROM (SELECT date_trunc('hour', timestamp) AS hour, count(*) AS c FROM student_violations GROUP BY 1) by_hour
+    ), '[]'::json)
+  )
+  FROM session_agg s;
+$$;
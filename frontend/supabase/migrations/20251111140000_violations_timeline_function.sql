@@ -0,0 +1,21 @@
+-- Violation counts in 5-minute bins, binned inside Postgres
+-- Returns the most recent p_limit bins in chronological order
+CREATE OR REPLACE FUNCTION public.get_violations_timeline(p_limit INTEGER DEFAULT 100)
+RETURNS TABLE (
+  "timestamp" TIMESTAMP WITH TIME ZONE,
+  count BIGINT
+)
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+  SELECT bin, c
+  FROM (
+    SELECT date_bin('5 minutes', v.timestamp, TIMESTAMPTZ '2000-01-01') AS bin, count(*) AS c
+    FROM public.violations v
+    GROUP BY 1
+    ORDER BY 1 DESC
+    LIMIT p_limit
+  ) recent
+  ORDER BY bin;
+$$;
@@ -0,0 +1,24 @@
+-- Answer key for grading an exam in one round-trip
+-- Resolves exam -> exam_template_id -> exam_questions inside Postgres instead of two
+-- dependent client queries. Returns NULL when the exam does not exist.
+CREATE OR REPLACE FUNCTION public.get_exam_grading_questions(p_exam_id UUID)
+RETURNS json
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+  SELECT json_build_object(
+    'exam_template_id', e.exam_template_id,
+    'questions', COALESCE((
+      SELECT json_agg(json_build_object(
+        'question_number', q.question_number,
+        'correct_answer', q.correct_answer,
+        'points', q.points
+      ))
+      FROM public.exam_questions q
+      WHERE q.exam_template_id = e.exam_template_id
+    ), '[]'::json)
+  )
+  FROM public.exams e
+  WHERE e.id = p_exam_id;
+$$;
@@ -0,0 +1,10 @@
+-- Indexes for the admin aggregate functions
+
+-- Per-type histograms (get_average_statistics) can be
+-- answered with an index-only scan instead of reading full violation rows
+CREATE INDEX IF NOT EXISTS idx_violations_violation_type
+ON public.violations(violation_type);
+
+-- A student's exams, newest first (per-student session lists)
+CREATE INDEX IF NOT EXISTS idx_exams_student_started_at
+ON public.exams(student_id, started_at DESC);
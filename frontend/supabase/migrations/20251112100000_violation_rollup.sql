@@ -0,0 +1,131 @@
+-- Pre-aggregated violation counts per student, 5-minute bucket and type
+-- Maintained by triggers on violations so dashboard timelines read a small rollup
+-- instead of grouping raw violation rows on every request. Raw violations stay the
+-- source of truth for drill-down and exports.
+CREATE TABLE IF NOT EXISTS public.violation_rollup (
+  student_id UUID,
+  bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+  violation_type TEXT NOT NULL,
+  count BIGINT NOT NULL DEFAULT 0,
+  CONSTRAINT violation_rollup_key UNIQUE NULLS NOT DISTINCT (student_id, bucket, violation_type)
+);
+
+CREATE INDEX IF NOT EXISTS idx_violation_rollup_bucket ON public.violation_rollup(bucket DESC);
+
+ALTER TABLE public.violation_rollup ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Anyone can read violation rollup" ON public.violation_rollup FOR SELECT USING (true);
+
+CREATE OR REPLACE FUNCTION public.violation_rollup_bucket(ts TIMESTAMP WITH TIME ZONE)
+RETURNS TIMESTAMP WITH TIME ZONE
+LANGUAGE sql
+IMMUTABLE
+AS $$
+  SELECT date_bin('5 minutes', ts, TIMESTAMPTZ '2000-01-01');
+$$;
+
+CREATE OR REPLACE FUNCTION public.violation_rollup_on_insert()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  INSERT INTO public.violation_rollup (student_id, bucket, violation_type, count)
+  VALUES (NEW.student_id, violation_rollup_bucket(NEW.timestamp), NEW.violation_type, 1)
+  ON CONFLICT (student_id, bucket, violation_type)
+  DO UPDATE SET count = violation_rollup.count + 1;
+  RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.violation_rollup_on_delete()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  UPDATE public.violation_rollup
+  SET count = count - 1
+  WHERE student_id IS NOT DISTINCT FROM OLD.student_id
+    AND bucket = violation_rollup_bucket(OLD.timestamp)
+    AND violation_type = OLD.violation_type;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS violations_rollup_insert ON public.violations;
+CREATE TRIGGER violations_rollup_insert
+AFTER INSERT ON public.violations
+FOR EACH ROW EXECUTE FUNCTION public.violation_rollup_on_insert();
+
+DROP TRIGGER IF EXISTS violations_rollup_delete ON public.violations;
+CREATE TRIGGER violations_rollup_delete
+AFTER DELETE ON public.violations
+FOR EACH ROW EXECUTE FUNCTION public.violation_rollup_on_delete();
+
+-- Backfill from existing violations
+TRUNCATE public.violation_rollup;
+INSERT INTO public.violation_rollup (student_id, bucket, violation_type, count)
+SELECT student_id, violation_rollup_bucket(timestamp), violation_type, count(*)
+FROM public.violations
+GROUP BY 1, 2, 3;
+
+-- Timeline reads the rollup (already in 5-minute buckets)
+CREATE OR REPLACE FUNCTION public.get_violations_timeline(p_limit INTEGER DEFAULT 100)
+RETURNS TABLE (
+  "timestamp" TIMESTAMP WITH TIME ZONE,
+  count BIGINT
+)
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+  SELECT bucket, c
+  FROM (
+    SELECT r.bucket, sum(r.count)::bigint AS c
+    FROM public.violation_rollup r
+    GROUP BY r.bucket
+    HAVING sum(r.count) > 0
+    ORDER BY r.bucket DESC
+    LIMIT p_limit
+  ) recent
+  ORDER BY bucket;
+$$;
+
+-- Student statistics read counts and the hourly timeline from the rollup
+CREATE OR REPLACE FUNCTION public.get_student_statistics(p_student_id UUID)
+RETURNS json
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+  WITH student_rollup AS (
+    SELECT bucket, violation_type, count
+    FROM public.violation_rollup
+    WHERE student_id = p_student_id AND count > 0
+  ),
+  session_agg AS (
+    SELECT
+      count(*) AS total_sessions,
+      avg(EXTRACT(EPOCH FROM (completed_at - started_at)) / 60.0)
+        FILTER (WHERE started_at IS NOT NULL AND completed_at IS NOT NULL) AS avg_duration
+    FROM public.exams
+    WHERE student_id = p_student_id
+  )
+  SELECT json_build_object(
+    'student_name', (SELECT name FROM public.students WHERE id = p_student_id),
+    'total_violations', COALESCE((SELECT sum(count) FROM student_rollup), 0),
+    'total_sessions', s.total_sessions,
+    'avg_session_duration_minutes', COALESCE(s.avg_duration, 0),
+    'violation_breakdown', COALESCE((
+      SELECT json_object_agg(violation_type, c)
+      FROM (SELECT violation_type, sum(count) AS c FROM student_rollup GROUP BY violation_type) by_type
+    ), '{}'::json),
+    'violations_over_time', COALESCE((
+      SELECT json_agg(json_build_object('timestamp', hour, 'count', c) ORDER BY hour)
+      FROM (SELECT date_trunc('hour', bucket) AS hour, sum(count) AS c FROM student_rollup GROUP BY 1) by_hour
+    ), '[]'::json)
+  )
+  FROM session_agg s;
+$$;
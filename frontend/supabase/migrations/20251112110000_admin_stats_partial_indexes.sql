@@ -0,0 +1,33 @@
+-- Serve the filtered session counters from narrow partial indexes
+-- Each counter becomes an index-only scan over just the matching exams, and the
+-- unfiltered session total uses the planner estimate like total_violations.
+CREATE INDEX IF NOT EXISTS idx_exams_in_progress ON public.exams(id) WHERE status = 'in_progress';
+CREATE INDEX IF NOT EXISTS idx_exams_completed ON public.exams(id) WHERE status = 'completed';
+
+CREATE OR REPLACE FUNCTION public.get_admin_stats()
+RETURNS json
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+  SELECT json_build_object(
+    'total_sessions', (
+      SELECT CASE
+        WHEN c.reltuples >= 0 THEN c.reltuples::bigint
+        ELSE (SELECT count(*) FROM public.exams)
+      END
+      FROM pg_class c
+      WHERE c.oid = 'public.exams'::regclass
+    ),
+    'active_sessions', (SELECT count(*) FROM public.exams WHERE status = 'in_progress'),
+    'completed_sessions', (SELECT count(*) FROM public.exams WHERE status = 'completed'),
+    'total_violations', (
+      SELECT CASE
+        WHEN c.reltuples >= 0 THEN c.reltuples::bigint
+        ELSE (SELECT count(*) FROM public.violations)
+      END
+      FROM pg_class c
+      WHERE c.oid = 'public.violations'::regclass
+    )
+  );
+$$;
@@ -0,0 +1,41 @@
+-- Keep violation_rollup in step when violations are updated
+-- Maintenance scripts rewrite violation_type (and may fix student_id/timestamp); the
+-- insert/delete triggers alone would leave the rollup counting the old key forever.
+CREATE OR REPLACE FUNCTION public.violation_rollup_on_update()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  IF NEW.student_id IS NOT DISTINCT FROM OLD.student_id
+     AND violation_rollup_bucket(NEW.timestamp) = violation_rollup_bucket(OLD.timestamp)
+     AND NEW.violation_type = OLD.violation_type THEN
+    RETURN NULL;
+  END IF;
+
+  UPDATE public.violation_rollup
+  SET count = count - 1
+  WHERE student_id IS NOT DISTINCT FROM OLD.student_id
+    AND bucket = violation_rollup_bucket(OLD.timestamp)
+    AND violation_type = OLD.violation_type;
+
+  INSERT INTO public.violation_rollup (student_id, bucket, violation_type, count)
+  VALUES (NEW.student_id, violation_rollup_bucket(NEW.timestamp), NEW.violation_type, 1)
+  ON CONFLICT (student_id, bucket, violation_type)
+  DO UPDATE SET count = violation_rollup.count + 1;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS violations_rollup_update ON public.violations;
+CREATE TRIGGER violations_rollup_update
+AFTER UPDATE OF student_id, "timestamp", violation_type ON public.violations
+FOR EACH ROW EXECUTE FUNCTION public.violation_rollup_on_update();
+
+-- Rebuild from violations to undo any drift from updates made before this trigger existed
+TRUNCATE public.violation_rollup;
+INSERT INTO public.violation_rollup (student_id, bucket, violation_type, count)
+SELECT student_id, violation_rollup_bucket(timestamp), violation_type, count(*)
+FROM public.violations
+GROUP BY 1, 2, 3;
@@ -0,0 +1,52 @@
+-- Add the fields the admin dashboard shows per student to get_students_with_violations
+-- (roll number, the exam of the latest violation and its subject), so the dashboard can
+-- render its student list from this summary instead of grouping every violation client-side.
+DROP FUNCTION IF EXISTS public.get_students_with_violations();
+
+CREATE FUNCTION public.get_students_with_violations()
+RETURNS TABLE (
+  student_id UUID,
+  student_name TEXT,
+  student_code TEXT,
+  violation_count BIGINT,
+  violation_types TEXT[],
+  latest_snapshot_url TEXT,
+  latest_violation TIMESTAMP WITH TIME ZONE,
+  latest_exam_id UUID,
+  subject_name TEXT,
+  subject_code TEXT
+)
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+  WITH per_student AS (
+    SELECT
+      v.student_id,
+      count(*) AS violation_count,
+      array_agg(DISTINCT v.violation_type) AS violation_types,
+      (array_agg(v.image_url ORDER BY v.timestamp DESC) FILTER (WHERE v.image_url IS NOT NULL))[1] AS latest_snapshot_url,
+      max(v.timestamp) AS latest_violation,
+      (array_agg(v.exam_id ORDER BY v.timestamp DESC) FILTER (WHERE v.exam_id IS NOT NULL))[1] AS latest_exam_id,
+      (array_agg(v.details ORDER BY v.timestamp DESC))[1] AS latest_details
+    FROM public.violations v
+    WHERE v.student_id IS NOT NULL
+    GROUP BY v.student_id
+  )
+  SELECT
+    p.student_id,
+    COALESCE(s.name, p.latest_details->>'student_name') AS student_name,
+    s.student_id AS student_code,
+    p.violation_count,
+    p.violation_types,
+    p.latest_snapshot_url,
+    p.latest_violation,
+    p.latest_exam_id,
+    COALESCE(t.subject_name, p.latest_details->>'subject_name') AS subject_name,
+    COALESCE(t.subject_code, p.latest_details->>'subject_code') AS subject_code
+  FROM per_student p
+  LEFT JOIN public.students s ON s.id = p.student_id
+  LEFT JOIN public.exams e ON e.id = p.latest_exam_id
+  LEFT JOIN public.exam_templates t ON t.id = e.exam_template_id
+  ORDER BY p.violation_count DESC;
+$$;
@@ -0,0 +1,3 @@
+-- The per-student statistics endpoint had no caller (the student report is per exam
+-- and reads its own rows), so drop the function instead of maintaining it
+DROP FUNCTION IF EXISTS public.get_student_statistics(UUID);
@@ -0,0 +1,66 @@
+-- Cut the write cost of maintaining violation_rollup (read by get_violations_timeline
+-- for the admin dashboard chart)
+-- Inserts and deletes apply one grouped upsert per statement from the transition table,
+-- so a frame's bulk violation insert touches each rollup row once instead of once per violation.
+CREATE OR REPLACE FUNCTION public.violation_rollup_on_insert()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  INSERT INTO public.violation_rollup (student_id, bucket, violation_type, count)
+  SELECT student_id, violation_rollup_bucket(timestamp), violation_type, count(*)
+  FROM new_rows
+  GROUP BY 1, 2, 3
+  ON CONFLICT (student_id, bucket, violation_type)
+  DO UPDATE SET count = violation_rollup.count + EXCLUDED.count;
+  RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.violation_rollup_on_delete()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  UPDATE public.violation_rollup r
+  SET count = r.count - d.count
+  FROM (
+    SELECT student_id, violation_rollup_bucket(timestamp) AS bucket, violation_type, count(*) AS count
+    FROM old_rows
+    GROUP BY 1, 2, 3
+  ) d
+  WHERE r.student_id IS NOT DISTINCT FROM d.student_id
+    AND r.bucket = d.bucket
+    AND r.violation_type = d.violation_type;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS violations_rollup_insert ON public.violations;
+CREATE TRIGGER violations_rollup_insert
+AFTER INSERT ON public.violations
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION public.violation_rollup_on_insert();
+
+DROP TRIGGER IF EXISTS violations_rollup_delete ON public.violations;
+CREATE TRIGGER violations_rollup_delete
+AFTER DELETE ON public.violations
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION public.violation_rollup_on_delete();
+
+-- Transition tables can't be combined with a column list, so updates stay per row;
+-- the WHEN clause skips the function call for updates that don't move a row's rollup key
+DROP TRIGGER IF EXISTS violations_rollup_update ON public.violations;
+CREATE TRIGGER violations_rollup_update
+AFTER UPDATE OF student_id, "timestamp", violation_type ON public.violations
+FOR EACH ROW
+WHEN (
+  NEW.student_id IS DISTINCT FROM OLD.student_id
+  OR violation_rollup_bucket(NEW.timestamp) <> violation_rollup_bucket(OLD.timestamp)
+  OR NEW.violation_type IS DISTINCT FROM OLD.violation_type
+)
+EXECUTE FUNCTION public.violation_rollup_on_update();
@@ -0,0 +1,23 @@
+-- Count sessions exactly again: the exams total is compared against the active and
+-- completed counts on the dashboard, and a stale planner estimate can fall below them.
+-- Only total_violations (a large, append-only table) keeps the reltuples estimate.
+CREATE OR REPLACE FUNCTION public.get_admin_stats()
+RETURNS json
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+  SELECT json_build_object(
+    'total_sessions', (SELECT count(*) FROM public.exams),
+    'active_sessions', (SELECT count(*) FROM public.exams WHERE status = 'in_progress'),
+    'completed_sessions', (SELECT count(*) FROM public.exams WHERE status = 'completed'),
+    'total_violations', (
+      SELECT CASE
+        WHEN c.reltuples >= 0 THEN c.reltuples::bigint
+        ELSE (SELECT count(*) FROM public.violations)
+      END
+      FROM pg_class c
+      WHERE c.oid = 'public.violations'::regclass
+    )
+  );
+$$;
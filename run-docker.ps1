@@ -15,7 +15,7 @@ if (Test-Path .env) {
     }
 } else {
     Write-Host "⚠️  No .env file found. Using environment variables from system or defaults." -ForegroundColor Yellow
-    Write-Host "   Make sure to set: SUPABASE_KEY, VITE_SUPABASE_PUBLISHABLE_KEY" -ForegroundColor Yellow
+    Write-Host "   Make sure to set: SUPABASE_KEY, ADMIN_PASSWORD, VITE_SUPABASE_PUBLISHABLE_KEY" -ForegroundColor Yellow
 }
 
 # Get environment variables (with defaults)
@@ -28,6 +28,12 @@ if (-not $SUPABASE_KEY) {
     exit 1
 }
 
+$ADMIN_PASSWORD = $env:ADMIN_PASSWORD
+if (-not $ADMIN_PASSWORD) { 
+    Write-Host "❌ ADMIN_PASSWORD is not set! Please set it in .env file or as environment variable." -ForegroundColor Red
+    exit 1
+}
+
 $VITE_SUPABASE_URL = $env:VITE_SUPABASE_URL
 if (-not $VITE_SUPABASE_URL) { $VITE_SUPABASE_URL = "https://ukwnvvuqmiqrjlghgxnf.supabase.co" }
 
@@ -69,6 +75,7 @@ docker run -d `
     -p 80:80 `
     -e SUPABASE_URL="$SUPABASE_URL" `
     -e SUPABASE_KEY="$SUPABASE_KEY" `
+    -e ADMIN_PASSWORD="$ADMIN_PASSWORD" `
     -e PORT=8001 `
     exameye-shield:latest
 
@@ -0,0 +1,88 @@
+"""
+Tests for the evidence helpers behind the snapshot proxy: the bucket URL guard and the LRU cache
+"""
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from evidence import SnapshotCache, evidence_object_path
+
+PREFIX = "https://example.supabase.co/storage/v1/object/public/violation-evidence/"
+
+
+class EvidenceObjectPathTest(unittest.TestCase):
+    def test_accepts_object_in_bucket(self):
+        url = PREFIX + "exam-1/student-1_phone_detected_20251112_120000_ab12cd34.jpg"
+        self.assertEqual(
+            evidence_object_path(url, PREFIX),
+            "exam-1/student-1_phone_detected_20251112_120000_ab12cd34.jpg"
+        )
+
+    def test_rejects_foreign_hosts(self):
+        for url in (
+            "http://169.254.169.254/latest/meta-data/",
+            "https://attacker.example/violation-evidence/a.jpg",
+            "https://example.supabase.co.attacker.example/storage/v1/object/public/violation-evidence/a.jpg",
+            "https://example.supabase.co/storage/v1/object/public/other-bucket/a.jpg",
+        ):
+            self.assertIsNone(evidence_object_path(url, PREFIX), url)
+
+    def test_rejects_parent_segments(self):
+        for path in ("../other-bucket/a.jpg", "exam-1/../../secret.jpg", "exam-1/.."):
+            self.assertIsNone(evidence_object_path(PREFIX + path, PREFIX), path)
+
+    def test_allows_dots_inside_names(self):
+        self.assertEqual(evidence_object_path(PREFIX + "exam-1/a..b.jpg", PREFIX), "exam-1/a..b.jpg")
+
+    def test_strips_query_string(self):
+        self.assertEqual(evidence_object_path(PREFIX + "exam-1/a.jpg?download=1", PREFIX), "exam-1/a.jpg")
+        self.assertEqual(evidence_object_path(PREFIX + "exam-1/a.jpg?x=/../b", PREFIX), "exam-1/a.jpg")
+
+    def test_rejects_empty_path(self):
+        self.assertIsNone(evidence_object_path(PREFIX, PREFIX))
+        self.assertIsNone(evidence_object_path(PREFIX + "?token=abc", PREFIX))
+
+
+class SnapshotCacheTest(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = SnapshotCache(max_bytes=30)
+        cache.put("a", b"x" * 10, "image/jpeg")
+        cache.put("b", b"x" * 10, "image/jpeg")
+        cache.put("c", b"x" * 10, "image/jpeg")
+        # Reading 'a' makes 'b' the oldest entry
+        self.assertIsNotNone(cache.get("a"))
+        cache.put("d", b"x" * 10, "image/jpeg")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(list(cache.entries), ["c", "a", "d"])
+
+    def test_evicts_until_under_cap(self):
+        cache = SnapshotCache(max_bytes=30)
+        cache.put("a", b"x" * 10, "image/jpeg")
+        cache.put("b", b"x" * 10, "image/jpeg")
+        cache.put("c", b"x" * 25, "image/png")
+        self.assertEqual(list(cache.entries), ["c"])
+        self.assertEqual(cache.size, 25)
+        self.assertEqual(cache.get("c"), (b"x" * 25, "image/png"))
+
+    def test_size_tracks_replaced_entries(self):
+        cache = SnapshotCache(max_bytes=100)
+        cache.put("a", b"x" * 10, "image/jpeg")
+        cache.put("b", b"x" * 20, "image/jpeg")
+        self.assertEqual(cache.size, 30)
+        cache.put("a", b"x" * 5, "image/jpeg")
+        self.assertEqual(cache.size, 25)
+        self.assertEqual(sum(len(content) for content, _ in cache.entries.values()), cache.size)
+
+    def test_skips_oversized_content(self):
+        cache = SnapshotCache(max_bytes=10)
+        cache.put("a", b"x" * 5, "image/jpeg")
+        cache.put("big", b"x" * 11, "image/jpeg")
+        self.assertIsNone(cache.get("big"))
+        self.assertEqual(list(cache.entries), ["a"])
+        self.assertEqual(cache.size, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()